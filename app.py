@@ -1,8 +1,14 @@
-from flask import Flask, request, jsonify
+# Must run before anything else imports socket / threading: with async_mode
+# eventlet, unpatched redis-py (message queue, presence) and worker threads
+# would block the hub
+import eventlet
+eventlet.monkey_patch()
+
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_pymongo import PyMongo
 from flask_jwt_extended import (
     JWTManager, create_access_token,
-    jwt_required, get_jwt_identity
+    jwt_required, get_jwt_identity, decode_token
 )
 from flask_cors import CORS
 import bcrypt
@@ -10,14 +16,51 @@ import os
 from datetime import timedelta, datetime, UTC
 from logger import LoggerFactory
 from config import Config
-from services.ai_movie_analyze_service import get_ai_movie_response
-from services.email_service import send_otp_email
-from services.quiz_service import generate_quiz_questions
-from services.predict_churn_service import predict_churn
-from services.chatbot_service import chatbot
+from date_utils import to_datetime
+from services.ai_movie_analyze_service import (
+    get_ai_movie_response, purge_ai_response_cache, get_ai_response_cache_stats
+)
+from services.email_service import send_otp_email, start_mail_queue, get_mail_queue_stats
+from services.quiz_service import generate_quiz_questions, start_quiz_bank_refill
+from services.predict_churn_service import (
+    predict_churn, record_login, record_watch_progress_batch, inference_queue
+)
+from services.churn_batch_service import start_churn_batch_scheduler
+from services.index_service import ensure_indexes, coverage_report, duplicate_report
+from services.dashboard_service import get_dashboard, invalidate_dashboard, get_dashboard_cache_stats
+from services.login_history_service import record_login_event
+from services.watch_history_service import record_watched
+from services.watch_progress_buffer import WatchProgressBuffer
+from services.spotlight_service import (
+    list_group_watch,
+    add_to_spotlight,
+    SpotlightFeed,
+    DEFAULT_PAGE_SIZE as SPOTLIGHT_DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE as SPOTLIGHT_MAX_PAGE_SIZE
+)
+from pymongo.errors import DuplicateKeyError
+from services.chatbot_service import chatbot, chatbot_stream
+from services.llm_service import get_llm_stats
+from services.chatbot_cache_service import chatbot_cache
+from services.presence_service import create_presence_backend, start_presence_cleanup
+from services.chat_service import ChatLimiter, ChatBroadcaster
+from services.playback_sync_service import PlaybackSync, server_time
+from services.socket_auth_service import SocketIdentityCache
+from services.watch_party_service import (
+    RoomCodePool,
+    WatchPartyCache,
+    random_code,
+    idle_expiry,
+    ended_expiry,
+    PARTY_MISSING,
+    PARTY_ENDED
+)
 import re
-import string
 import random
+import hmac
+import json
+import atexit
+from functools import wraps
 from flask_socketio import SocketIO, emit, join_room, leave_room
 
 
@@ -41,7 +84,8 @@ app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=2)
 socketio = SocketIO(
     app,
     cors_allowed_origins="*",   # tighten this to your frontend URL in production
-    async_mode="eventlet"
+    async_mode="eventlet",
+    message_queue=app.config["SOCKETIO_MESSAGE_QUEUE"] or None
 )
 
 # MongoDB Table Collection
@@ -51,37 +95,148 @@ user_otp_collection = mongo.db.user_otp
 group_watch_collection = mongo.db.group_watch
 user_watched_movie_collection = mongo.db.user_watched_movies
 watch_parties_collection = mongo.db.watch_parties
+login_history_collection = mongo.db.login_history
+mail_outbox_collection = mongo.db.mail_outbox
+ai_movie_response_collection = mongo.db.ai_movie_responses
+quiz_bank_collection = mongo.db.quiz_bank
 
 #Creating logger
 logger = LoggerFactory.get_logger(__name__)
 
 
-# ADD this dict after your collections
-socket_room_map = {}  # tracks sid -> {room, username}
+# Verified socket identities, cached by sid
+socket_identities = SocketIdentityCache(decode_token)
+
+# Room rosters (room -> {sid: username}, sid -> {room: username});
+# shared across workers when a message queue is set
+presence = create_presence_backend(app.config["SOCKETIO_MESSAGE_QUEUE"])
+
+# Watch-party chat throttling and (for large rooms) batched fan-out
+chat_limiter = ChatLimiter(
+    max_length=app.config["CHAT_MAX_MESSAGE_LENGTH"],
+    sid_rate=app.config["CHAT_SENDER_RATE"],
+    sid_burst=app.config["CHAT_SENDER_BURST"],
+    room_rate=app.config["CHAT_ROOM_RATE"],
+    room_burst=app.config["CHAT_ROOM_BURST"]
+)
+chat_broadcaster = ChatBroadcaster(
+    socketio,
+    coalesce_room_size=app.config["CHAT_COALESCE_ROOM_SIZE"],
+    coalesce_window_ms=app.config["CHAT_COALESCE_WINDOW_MS"]
+)
+
+
+# Index bootstrap (idempotent)
+if app.config["ENSURE_INDEXES_ON_STARTUP"]:
+    try:
+        ensure_indexes(mongo.db)
+    except Exception:
+        logger.exception("Index bootstrap failed")
+
+
+# Background workers
+try:
+    start_quiz_bank_refill(quiz_bank_collection, app.config["GOOGLE_API_KEY"])
+except Exception:
+    logger.exception("Failed to start quiz bank refill worker")
+
+try:
+    start_mail_queue(mail_outbox_collection, app.config)
+except Exception:
+    logger.exception("Failed to start mail queue, OTP e-mails will be sent inline")
+
+# /watch-progress heartbeats are coalesced and flushed as bulk upserts;
+# dashboards are invalidated and the churn feature store is updated only
+# once the batch is actually in Mongo
+def on_watch_progress_flush(entries):
+    for username in {e["username"] for e in entries}:
+        invalidate_dashboard(username)
+    record_watch_progress_batch(entries)
+
+
+watch_progress_buffer = WatchProgressBuffer(
+    user_watched_movie_collection,
+    on_flush=on_watch_progress_flush,
+    flush_interval=app.config["WATCH_PROGRESS_FLUSH_INTERVAL"],
+    max_entries=app.config["WATCH_PROGRESS_FLUSH_MAX_ENTRIES"]
+)
+watch_progress_buffer.start()
+atexit.register(watch_progress_buffer.close)
+
+# Spotlight is served from memory once the first sync has loaded it
+spotlight_feed = SpotlightFeed(
+    group_watch_collection,
+    refresh_interval=app.config["SPOTLIGHT_REFRESH_INTERVAL"]
+)
+spotlight_feed.start()
+
+start_presence_cleanup(
+    presence,
+    watch_parties_collection,
+    socketio,
+    interval=app.config["PRESENCE_CLEANUP_INTERVAL"]
+)
+
+# Pre-checked watch-party codes for /create-watch-party
+room_code_pool = RoomCodePool(watch_parties_collection, size=app.config["ROOM_CODE_POOL_SIZE"])
+room_code_pool.start()
+
+# Active parties and premium status, so shared party links do not hit Mongo
+watch_party_cache = WatchPartyCache(
+    watch_parties_collection,
+    subscriptions_collection,
+    maxsize=app.config["WATCH_PARTY_CACHE_SIZE"],
+    ttl=app.config["WATCH_PARTY_CACHE_TTL"],
+    negative_ttl=app.config["WATCH_PARTY_NEGATIVE_CACHE_TTL"],
+    premium_ttl=app.config["PREMIUM_CACHE_TTL"]
+)
+
+# Host-driven playback state per watch party, with periodic sync ticks
+playback_sync = PlaybackSync(
+    watch_parties_collection,
+    socketio,
+    presence,
+    tick_interval=app.config["PLAYBACK_SYNC_TICK_INTERVAL"]
+)
+playback_sync.start()
+
+if app.config["CHURN_BATCH_INTERVAL_HOURS"] > 0:
+    start_churn_batch_scheduler(app.config["CHURN_BATCH_INTERVAL_HOURS"])
 
 
 # ── Helper: generate short unique code like "XR7T9" ─────────────
+# Fallback when the pre-checked pool is empty or lost a race
 def generate_room_code(length=6):
-    chars = string.ascii_uppercase + string.digits
     while True:
-        code = "".join(random.choices(chars, k=length))
+        code = random_code(length)
         # ensure uniqueness in DB
         if not watch_parties_collection.find_one({"code": code}):
             return code
 
-# ADD after: logger = LoggerFactory.get_logger(__name__)
-def get_user_from_token(token):
-    try:
-        # flask-jwt-extended stores identity in "sub" claim
-        payload = JWTManager._decode_jwt_from_config  # not used — decode manually
-        import base64, json
-        parts = token.split(".")
-        padded = parts[1] + "=" * (4 - len(parts[1]) % 4)
-        decoded = json.loads(base64.urlsafe_b64decode(padded))
-        username = decoded.get("sub") or "User"
-        return {"username": username, "avatar": username[0].upper()}
-    except Exception:
-        return {"username": "Guest", "avatar": "G"}
+
+# ── Helper: verified identity of the calling socket ─────────────
+def socket_user(data):
+    """
+    Verified identity of the calling socket: a dictionary lookup once the
+    token has been verified (at connect or on the first event). Emits
+    "auth_error" to the sender and returns None when unauthenticated.
+    """
+    user = socket_identities.resolve(request.sid, (data or {}).get("token"))
+    if user is None:
+        emit("auth_error", {"message": "Unauthorized"})
+    return user
+
+
+# ── Helper: protect internal/admin endpoints with a shared key ──
+def admin_required(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        expected = app.config.get("ADMIN_API_KEY")
+        provided = request.headers.get("X-Admin-Key", "")
+        if not expected or not hmac.compare_digest(provided, expected):
+            return jsonify({"success": False, "message": "Forbidden"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
 
 
 # Email pattern matching regex
@@ -103,22 +258,27 @@ def register():
     if not name or not username or not password:
         return jsonify({"msg": "All fields are required"}), 400
 
-    if users_collection.find_one({"username": username}):
+    username = username.lower()
+
+    if users_collection.find_one({"username": username}, {"_id": 1}):
         return jsonify({"msg": "User already exists"}), 400
 
     hashed_pw = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
 
-    users_collection.insert_one({
-        "name": name,
-        "username": username.lower(),
-        "password": hashed_pw,
-        "login_data":[],
-        "watched_data":[],
-        "taken_subscription":False,
-        "subscription_valid":"",
-        "max_streak":0,
-        "movie_count":0
-    })
+    try:
+        users_collection.insert_one({
+            "name": name,
+            "username": username,
+            "password": hashed_pw,
+            "recent_logins":[],
+            "watched_data":[],
+            "taken_subscription":False,
+            "subscription_valid":"",
+            "max_streak":0,
+            "movie_count":0
+        })
+    except DuplicateKeyError:
+        return jsonify({"msg": "User already exists"}), 400
 
     return jsonify({"msg": "User registered successfully"}), 201
 
@@ -136,7 +296,11 @@ def login():
     
     username = username.lower()
 
-    user = users_collection.find_one({"username": username})
+    # Only the fields login needs, never the history arrays
+    user = users_collection.find_one(
+        {"username": username},
+        {"name": 1, "password": 1, "taken_subscription": 1, "subscription_valid": 1}
+    )
     if not user:
         return jsonify({"msg": "Invalid credentials"}), 401
 
@@ -160,17 +324,19 @@ def login():
     redirect_to = True
     if user['taken_subscription'] == True:
         logger.info("inside prediction")
-        login_doc = users_collection.find_one({"username": username})
-        watch_docs = list(user_watched_movie_collection.find({"username": username}))
-        result = predict_churn(username, login_doc, watch_docs)
-        churn_detected = bool(result['churn_prediction'])
-
-        logger.info(f"In App.py Predict churn result :\n{result}")
+        try:
+            result = predict_churn(username)
+            churn_detected = bool(result['churn_prediction'])
+            logger.info(f"In App.py Predict churn result :\n{result}")
+        except Exception:
+            # Scoring problems must never fail the login
+            logger.exception(f"Churn prediction failed for {username}")
+            churn_detected = False
 
         subscription_valid = user["subscription_valid"]  # from MongoDB
 
-        # convert string to date
-        valid_date = datetime.strptime(subscription_valid, "%Y-%m-%d").date()
+        # stored as a BSON date (or a legacy "%Y-%m-%d" string)
+        valid_date = to_datetime(subscription_valid).date()
         today = datetime.today().date()
 
         
@@ -186,14 +352,13 @@ def login():
 
 
 
-    users_collection.update_one(
-        {"username": username},
-        {
-            "$push": {
-                "login_data": datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-            }
-        }
-    )
+    login_at = datetime.now()
+    record_login_event(users_collection, login_history_collection, username, login_at)
+
+    try:
+        record_login(username, login_at)
+    except Exception:
+        logger.exception("Failed to update churn features for login")
 
 
 
@@ -219,128 +384,118 @@ def movie_description():
     if not movie_name or not release_date:
         return jsonify({"error": "movie_name and release_date are required"}), 400
 
-    return get_ai_movie_response(movie_name=movie_name, release_date=release_date)
+    return get_ai_movie_response(
+        movie_name=movie_name,
+        release_date=release_date,
+        cache_collection=ai_movie_response_collection
+    )
 
 
-#Get dashboard route
-@app.route("/subscriptions", methods=["GET"])
-@jwt_required()
-def get_user_dashboard():
-    logger.info("API '/subscriptions' called ...!!!")
+# AI Movie response cache stats (admin)
+@app.route("/admin/movie-ai-cache/stats", methods=["GET"])
+@admin_required
+def movie_ai_cache_stats():
+    logger.info("API '/admin/movie-ai-cache/stats' called ...!!!")
+    return jsonify(get_ai_response_cache_stats()), 200
+
+
+# AI Movie response cache purge (admin)
+# Body (optional): { "movie_name": "...", "release_date": "..." } purges one entry
+@app.route("/admin/movie-ai-cache", methods=["DELETE"])
+@admin_required
+def movie_ai_cache_purge():
+    logger.info("API '/admin/movie-ai-cache' purge called ...!!!")
+    data = request.get_json(silent=True) or {}
+
     try:
-        # Get user identity from JWT
-        username = get_jwt_identity()
+        result = purge_ai_response_cache(
+            ai_movie_response_collection,
+            movie_name=data.get("movie_name"),
+            release_date=data.get("release_date")
+        )
+        return jsonify({"success": True, **result}), 200
+    except Exception:
+        logger.exception("Exception occured while purging AI movie response cache")
+        return jsonify({"success": False, "message": "Failed to purge cache"}), 500
 
-        # logger.info(f"User : {username}")
 
-        subscription = None
+# LLM chain construction vs invoke cost (admin)
+@app.route("/admin/llm-stats", methods=["GET"])
+@admin_required
+def llm_stats():
+    logger.info("API '/admin/llm-stats' called ...!!!")
+    return jsonify(get_llm_stats()), 200
 
-        # Fetch dashboard data for this user
-        try:
-            subscription = subscriptions_collection.find_one(
-                {"username": username},
-                {"_id": 0}  # exclude Mongo _id from response
-            )
-            # logger.info(f"Subscription Details : {subscription}")
-        except Exception as e:
-            logger.error(f"Error : {e}")
 
-        if not subscription:
-            return jsonify({
-                "is_premium_member": False
-            }), 201
-        
-        watched_movies = subscription.get("watched_movies", [])
+# Churn inference micro-batching metrics (admin)
+@app.route("/admin/churn-inference/stats", methods=["GET"])
+@admin_required
+def churn_inference_stats():
+    logger.info("API '/admin/churn-inference/stats' called ...!!!")
+    return jsonify(inference_queue.stats()), 200
 
-        latest_five = sorted(
-            watched_movies,
-            key=lambda x: datetime.strptime(x["created_at"], "%Y-%m-%d %H:%M:%S"),
-            reverse=True
-        )[:5]
 
+# Dashboard snapshot cache metrics (admin)
+@app.route("/admin/dashboard-cache/stats", methods=["GET"])
+@admin_required
+def dashboard_cache_stats():
+    logger.info("API '/admin/dashboard-cache/stats' called ...!!!")
+    return jsonify(get_dashboard_cache_stats()), 200
 
-        user = users_collection.find_one(
-            {"username": username},
-            {"_id": 0, "watched_data": 1, "max_streak":1}   # projection (only return watched_data)
-        )
 
-        logger.info(f"User :\n{user}")
+# Watch progress write-coalescing metrics (admin)
+@app.route("/admin/watch-progress/stats", methods=["GET"])
+@admin_required
+def watch_progress_stats():
+    logger.info("API '/admin/watch-progress/stats' called ...!!!")
+    return jsonify(watch_progress_buffer.stats()), 200
 
-        logger.info(f"User Watched movie data :\n{user}")
 
-        three_months_ago = datetime.utcnow() - timedelta(days=90)
+# Outbound mail queue metrics (admin)
+@app.route("/admin/mail-queue/stats", methods=["GET"])
+@admin_required
+def mail_queue_stats():
+    logger.info("API '/admin/mail-queue/stats' called ...!!!")
+    return jsonify(get_mail_queue_stats()), 200
 
-        pipeline = [
-            {
-                "$match": {
-                    "username": username
-                }
-            },
-            {
-                "$addFields": {
-                    "watched_at_date": {
-                        "$dateFromString": {
-                            "dateString": "$watched_at",
-                            "format": "%d-%m-%Y %H:%M:%S"
-                        }
-                    }
-                }
-            },
-            {
-                "$match": {
-                    "watched_at_date": {"$gte": three_months_ago}
-                }
-            },
-            {
-                "$sort": {"completion_rate": -1}
-            },
-            {
-                "$group": {
-                    "_id": "$username",
-                    "explores": {
-                        "$push": {
-                            "explore": "$explore",
-                            "explore_id": "$explore_id"
-                        }
-                    }
-                }
-            },
-            {
-                "$project": {
-                    "_id": 0,
-                    "username": "$_id",
-                    "top_explores": {"$slice": ["$explores", 3]}
-                }
-            }
-        ]
-
-        result = list(user_watched_movie_collection.aggregate(pipeline))
-        logger.info(f"Response result for recommendation :\n{result}")
-        top_explores=[]
-        top_explores = result[0].get("top_explores") if result and len(result) > 0 else None
-        if top_explores:
-            logger.info(f"Top 3 completed movies explore and id {top_explores}")
-
-
-        temp = {
-            "is_premium_member": True,
-            "score": subscription["score"],
-            "watched_movies":latest_five,
-            "heatmap_data": user["watched_data"],
-            "recommendation":top_explores,
-            "max_streak":user['max_streak']
-        }
 
-        logger.info(f"Result in subscription  :\n{temp}")
+# Watch-party chat throttling / fan-out metrics (admin)
+@app.route("/admin/chat/stats", methods=["GET"])
+@admin_required
+def chat_stats():
+    logger.info("API '/admin/chat/stats' called ...!!!")
+    return jsonify({
+        "limits": chat_limiter.stats(),
+        "fanout": chat_broadcaster.stats()
+    }), 200
+
 
+# Index coverage report (admin)
+@app.route("/admin/index-report", methods=["GET"])
+@admin_required
+def index_report():
+    logger.info("API '/admin/index-report' called ...!!!")
+    try:
         return jsonify({
-            "is_premium_member": True,
-            "score": subscription["score"],
-            "watched_movies":latest_five,
-            "heatmap_data": user["watched_data"],
-            "recommendation":top_explores,
-            "max_streak":user['max_streak']
+            "queries": coverage_report(mongo.db),
+            "duplicates": duplicate_report(mongo.db)
         }), 200
+    except Exception:
+        logger.exception("Exception occured while building index report")
+        return jsonify({"success": False, "message": "Failed to build index report"}), 500
+
+
+#Get dashboard route
+@app.route("/subscriptions", methods=["GET"])
+@jwt_required()
+def get_user_dashboard():
+    logger.info("API '/subscriptions' called ...!!!")
+    try:
+        # Get user identity from JWT
+        username = get_jwt_identity()
+
+        payload, status = get_dashboard(username, subscriptions_collection)
+        return jsonify(payload), status
 
     except Exception as e:
         return jsonify({
@@ -385,6 +540,7 @@ def send_otp():
                 {
                     "$set": {
                         "otp": otp,
+                        "created_at": datetime.now(UTC)  # TTL index expires stale OTPs
                     },
                     "$setOnInsert": {
                         "email": email, "username":username
@@ -393,6 +549,7 @@ def send_otp():
                 upsert=True
             )
 
+            # Returns once the e-mail is queued; delivery happens in the background
             if send_otp_email(email, otp):
                 return jsonify({
                     "success": True,
@@ -467,11 +624,23 @@ def verify_otp():
         }
 
         try:
-            subscriptions_collection.insert_one(document)
+            # Upsert: the user may already be premium through /payment
+            subscriptions_collection.update_one(
+                {"username": username},
+                {"$setOnInsert": document},
+                upsert=True
+            )
             user_otp_collection.delete_one({
                 "email":email,
                 "username":username
             })
+            watch_party_cache.invalidate_premium(username)
+            # Keep the verified address for retention campaigns
+            users_collection.update_one(
+                {"username": username},
+                {"$set": {"email": email}}
+            )
+            invalidate_dashboard(username)
             return jsonify({
                 "success": True,
                 "message": "You're now Premium Member"
@@ -502,102 +671,24 @@ def watched_movies_shows():
             "message": "Data not found"
         }), 500
     
-    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    today = datetime.now().strftime("%Y-%m-%d")
-    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-
-    user = users_collection.find_one({"username": username})
-
-    if not user:
-        logger.info("User data not found in database")
-        
-
-    watched_data = user.get("watched_data", [])
-
-    # 🔎 Check if today's date already exists
-    today_entry = next((item for item in watched_data if item["date"] == today), None)
-
-    if today_entry:
-        # ✅ Increase frequency only
-        users_collection.update_one(
-            {
-                "username": username,
-                "watched_data.date": today
-            },
-            {
-                "$inc": {"watched_data.$.frequency": 1}
-            }
-        )
-        logger.info("Today's frequency incremented")
-
-    else:
-        # ❌ Today's entry not present → Add new entry
-        users_collection.update_one(
-            {"username": username},
-            {
-                "$push": {
-                    "watched_data": {
-                        "date": today,
-                        "frequency": 1
-                    }
-                }
-            }
-        )
-
-        # 🔥 Streak Logic (ONLY when new day entry)
-        yesterday_present = any(item["date"] == yesterday for item in watched_data)
-
-        if yesterday_present:
-            movie_count = user.get("movie_count", 0) + 1
-        else:
-            movie_count = 1
-
-        max_streak = user.get("max_streak", 0)
-
-        if movie_count > max_streak:
-            max_streak = movie_count
-
-        users_collection.update_one(
-            {"username": username},
-            {
-                "$set": {
-                    "movie_count": movie_count,
-                    "max_streak": max_streak
-                }
-            }
-        )
-
-        logger.info("New day added + streak updated")
-
     try:
-        result = subscriptions_collection.update_one(
-            {
-                "username": username,
-                "watched_movies.explore": explore,
-                "watched_movies.explore_id": explore_id
-            },
-            {
-                "$set": {
-                    "watched_movies.$.created_at": created_at
-                }
-            }
+        user_found = record_watched(
+            users_collection,
+            subscriptions_collection,
+            username,
+            explore,
+            explore_id,
+            datetime.now()
         )
 
-        if result.matched_count == 0:
-            appended_object = {
-                "explore": explore,
-                "explore_id": explore_id,
-                "created_at": created_at
-            }
+        if not user_found:
+            logger.info("User data not found in database")
+            return jsonify({
+                "success": False,
+                "message": "User not found"
+            }), 404
 
-            subscriptions_collection.update_one(
-                {"username": username},
-                {
-                    "$push": {
-                        "watched_movies": appended_object
-                    }
-                }
-            )
+        invalidate_dashboard(username)
 
         return jsonify({
             "success": True,
@@ -630,44 +721,16 @@ def watch_together():
             "message": "Provide Media and Media ID"
         }), 400
 
-    result = group_watch_collection.find_one({
-        "username": username,
-        "explore": explore,
-        "explore_id": explore_id
-    })
-
     now = datetime.now()
 
-    if result:
-        added_at = datetime.strptime(result["added_at"], "%Y-%m-%d %H:%M:%S")
-        seven_days_ago = now - timedelta(days=7)
-
-        if added_at >= seven_days_ago:
+    try:
+        if not add_to_spotlight(group_watch_collection, username, explore, explore_id, now):
             return jsonify({
                 "success": False,
                 "message": "Already added to Spotlight"
             }), 409
-        else:
-            group_watch_collection.update_one(
-                {"_id": result["_id"]},
-                {"$set": {"added_at": now.strftime("%Y-%m-%d %H:%M:%S")}}
-            )
-
-            return jsonify({
-                "success": True,
-                "message": "Added to Spotlight"
-            }), 201
-
-
-    document = {
-        "username": username,
-        "explore": explore,
-        "explore_id": explore_id,
-        "added_at": now.strftime("%Y-%m-%d %H:%M:%S")
-    }
 
-    try:
-        group_watch_collection.insert_one(document)
+        spotlight_feed.record(username, explore, explore_id, now)
         return jsonify({
             "success": True,
             "message": "Added to Spotlight"
@@ -681,6 +744,7 @@ def watch_together():
 
     
 #Route for get watch together list
+# Query params: limit (default 50, max 200), after (cursor from the previous page)
 @app.route("/watch-together-list", methods=["GET"])
 @jwt_required()
 def get_watch_together():
@@ -689,40 +753,25 @@ def get_watch_together():
     try:
 
         username = get_jwt_identity()
-        seven_days_ago = datetime.now() - timedelta(days=7)
-
-        # Fetch all records
-        records = group_watch_collection.find({
-            "username": {"$ne": username}
-        })
-
-        user_map = {}
 
-        for doc in records:
-            try:
-                added_at = datetime.strptime(doc["added_at"], "%Y-%m-%d %H:%M:%S")
-            except Exception:
-                continue  # skip invalid dates
-
-            # Skip records older than 7 days
-            if added_at < seven_days_ago:
-                continue
-
-            username = doc["username"]
-
-            if username not in user_map:
-                user_map[username] = {
-                    "username": username,
-                    "user_movie_list": []
-                }
+        try:
+            limit = int(request.args.get("limit", SPOTLIGHT_DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "message": "limit must be an integer"
+            }), 400
+        limit = max(1, min(limit, SPOTLIGHT_MAX_PAGE_SIZE))
+        after = request.args.get("after")
 
-            user_map[username]["user_movie_list"].append({
-                "explore": doc["explore"],
-                "explore_id": doc["explore_id"]
-            })
+        if spotlight_feed.loaded:
+            page, next_cursor = spotlight_feed.page(username, limit, after)
+        else:
+            page, next_cursor = list_group_watch(group_watch_collection, username, limit, after)
 
         return jsonify({
-            "group_watch_list": list(user_map.values())
+            "group_watch_list": page,
+            "next_cursor": next_cursor
         }), 200
     except Exception as e:
         logger.exception(f"Exception occured while creating group watch list")
@@ -769,6 +818,7 @@ def update_user_score():
                 {"username":username},
                 {"$set": {"score":updated_score}}
             )
+        invalidate_dashboard(username)
         logger.info(f"Score updated successfully")
         return jsonify({
             "success": True,
@@ -790,7 +840,7 @@ def generate_quiz():
     logger.info(f"API '/quiz' called...!!!")
 
     username = get_jwt_identity()
-    return generate_quiz_questions(username)
+    return generate_quiz_questions(username, quiz_bank_collection)
 
 # Route for user watch activity
 @app.route("/watch-progress", methods=["POST"])
@@ -810,17 +860,15 @@ def save_watch_progress():
         if not explore or not explore_id:
             return jsonify({"error": "Missing Data"}), 400
 
-        # Update if record exists (prevents duplicates)
-        user_watched_movie_collection.insert_one(
-            {
-                "username": username,
-                "explore": explore,
-                "explore_id": explore_id,
-                "watched_seconds": watched_seconds,
-                "total_duration": total_duration,
-                "completion_rate": completion_rate,
-                "watched_at": datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-            }
+        # Buffered: one upsert per (user, title) is written on the next flush
+        watch_progress_buffer.add(
+            username,
+            explore,
+            explore_id,
+            float(watched_seconds or 0),
+            float(total_duration or 0),
+            float(completion_rate or 0),
+            datetime.now()
         )
 
         return jsonify({"message": "Watch progress saved successfully"}), 200
@@ -851,7 +899,7 @@ def payment():
 
         # convert string date to datetime
         if subscription_valid:
-            sub_date = datetime.strptime(subscription_valid, "%Y-%m-%d")
+            sub_date = to_datetime(subscription_valid)
         else:
             sub_date = datetime.today()
 
@@ -861,14 +909,14 @@ def payment():
         else:
             new_valid_date = datetime.today() + timedelta(days=duration)
 
-        new_valid_date_str = new_valid_date.strftime("%Y-%m-%d")
+        new_valid_date = new_valid_date.replace(hour=0, minute=0, second=0, microsecond=0)
 
         logger.info("updating user to premium")
         users_collection.update_one(
             {"username": username},
             {
                 "$set": {
-                    "subscription_valid": new_valid_date_str,
+                    "subscription_valid": new_valid_date,
                     "taken_subscription": True
                 }
             }
@@ -881,10 +929,15 @@ def payment():
             "watched_movies": []
         }
 
-        existing_user = subscriptions_collection.find_one({"username": username})
+        result = subscriptions_collection.update_one(
+            {"username": username},
+            {"$setOnInsert": document},
+            upsert=True
+        )
 
-        if not existing_user:
-            subscriptions_collection.insert_one(document)
+        if result.upserted_id is not None:
+            invalidate_dashboard(username)
+            watch_party_cache.invalidate_premium(username)
 
         return jsonify({
             "success": True,
@@ -924,6 +977,60 @@ def chatbot_method():
     return chatbot(query)
 
 
+# chatbot similarity cache stats (admin)
+@app.route('/admin/chatbot-cache/stats', methods=['GET'])
+@admin_required
+def chatbot_cache_stats():
+    logger.info("API '/admin/chatbot-cache/stats' called...!!!")
+    return jsonify(chatbot_cache.stats()), 200
+
+
+# chatbot streaming route (server-sent events)
+# Emits "token" events with partial text, then a single "done" event
+# carrying the full reply. /chat-bot stays available as the non-streaming fallback.
+@app.route('/chat-bot/stream', methods=['POST'])
+@jwt_required()
+def chatbot_stream_method():
+    logger.info("API /chat-bot/stream called...!!!")
+
+    data = request.get_json(silent=True)
+    if not data:
+        logger.warning("Empty request body received")
+        return jsonify({
+            "success": False,
+            "message": "Request body is empty"
+        }), 400
+
+    query = data.get("query")
+    if not query or not isinstance(query, str) or query.strip() == "":
+        logger.warning("Invalid query received: %s", query)
+        return jsonify({
+            "success": False,
+            "message": "Query not found or invalid"
+        }), 400
+
+    def generate():
+        reply = []
+        try:
+            for chunk in chatbot_stream(query):
+                reply.append(chunk)
+                yield f"event: token\ndata: {json.dumps({'token': chunk})}\n\n"
+
+            done = {"success": True, "reply": "".join(reply).strip()}
+            yield f"event: done\ndata: {json.dumps(done)}\n\n"
+
+        except Exception as e:
+            logger.exception(f"Error streaming movie recommendations:\n{e}")
+            error = {"success": False, "message": "Error while generating response. Try again later."}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 
 
 
@@ -931,54 +1038,87 @@ def chatbot_method():
 # 3. Join a movie room
 #    Frontend emits: { room: "movie-278", token: "..." }
 # -----------------------------------------------------------
-# UPDATE your existing on_join to also store sid mapping:
+def presence_snapshot(room):
+    # A user with several tabs (sids) is one member
+    members = sorted(set(presence.members(room).values()))
+    return {
+        "room":    room,
+        "count":   len(members),
+        "members": members
+    }
+
+
+def broadcast_presence(room):
+    emit("presence_update", presence_snapshot(room), to=room)
+
+
+# Frontend may send the token once at connect: io(url, { auth: { token } })
+@socketio.on("connect")
+def on_connect(auth=None):
+    if auth and auth.get("token"):
+        socket_identities.authenticate(request.sid, auth["token"])
+
+
 @socketio.on("join")
 def on_join(data):
-    token = data.get("token", "")
     room  = data.get("room", "")
-    user  = get_user_from_token(token)
+    user  = socket_user(data)
 
-    if not room:
+    if not room or not user:
         return
 
     join_room(room)
-    socket_room_map[request.sid] = {"room": room, "username": user["username"]}  # ADD this line
+    presence.join(request.sid, room, user["username"])
 
     emit("system_message", {
         "message": f"{user['username']} joined the chat",
     }, to=room)
+    broadcast_presence(room)
+
+    # Late joiners of a watch party start from the current playback state
+    state = playback_sync.get_state(room)
+    if state:
+        emit("playback_state", state)
 
 
 # ADD after the on_join function
 @socketio.on("send_message")
 def handle_message(data):
-    token   = data.get("token", "")
     room    = data.get("room", "")
     message = data.get("message", "").strip()
-    user    = get_user_from_token(token)
+    user    = socket_user(data)
+
+    if not room or not message or not user:
+        return
 
-    if not room or not message:
+    reason = chat_limiter.check(request.sid, room, message)
+    if reason:
+        # Only the sender is told; the room never sees dropped messages
+        emit("message_rejected", {"reason": reason})
         return
 
     timestamp = datetime.now().strftime("%I:%M %p")
 
-    emit("receive_message", {
+    chat_broadcaster.send(room, {
         "user":      user["username"],
         "avatar":    user["avatar"],
         "message":   message,
         "timestamp": timestamp,
-    }, to=room)
+    }, presence.room_size(room))
 
 
 # ADD this new handler anywhere after on_join:
 @socketio.on("disconnect")
 def on_disconnect():
     sid = request.sid
-    info = socket_room_map.pop(sid, None)  # remove from map
-    if info:
+    left = presence.leave(sid)
+    chat_limiter.forget_sid(sid)
+    socket_identities.evict(sid)
+    for room, username in left.items():
         emit("system_message", {
-            "message": f"{info['username']} left the room",
-        }, to=info["room"])
+            "message": f"{username} left the room",
+        }, to=room)
+        broadcast_presence(room)
     logger.info(f"Client disconnected: {sid}")
 
 
@@ -986,19 +1126,54 @@ def on_disconnect():
 # ADD after on_disconnect:
 @socketio.on("leave")
 def on_leave(data):
-    token = data.get("token", "")
     room  = data.get("room", "")
-    user  = get_user_from_token(token)
+    user  = socket_user(data)
 
-    if not room:
+    if not room or not user:
         return
 
     leave_room(room)
-    socket_room_map.pop(request.sid, None)
+    presence.leave(request.sid, room)
 
     emit("system_message", {
         "message": f"{user['username']} left the room",
     }, to=room)
+    broadcast_presence(room)
+
+
+
+# -----------------------------------------------------------
+# Chatbot over Socket.IO (streaming)
+# Frontend emits: { query: "sad movies under 2 hours", token: "..." }
+# Server replies to the sender only with "chat_bot_token" events,
+# then "chat_bot_done" (or "chat_bot_error")
+# -----------------------------------------------------------
+@socketio.on("chat_bot_query")
+def on_chat_bot_query(data):
+    query = data.get("query", "")
+
+    if socket_identities.resolve(request.sid, data.get("token")) is None:
+        emit("chat_bot_error", {"success": False, "message": "Unauthorized"})
+        return
+
+    if not query or not isinstance(query, str) or query.strip() == "":
+        emit("chat_bot_error", {"success": False, "message": "Query not found or invalid"})
+        return
+
+    reply = []
+    try:
+        for chunk in chatbot_stream(query):
+            reply.append(chunk)
+            emit("chat_bot_token", {"token": chunk})
+
+        emit("chat_bot_done", {"success": True, "reply": "".join(reply).strip()})
+
+    except Exception as e:
+        logger.exception(f"Error streaming movie recommendations:\n{e}")
+        emit("chat_bot_error", {
+            "success": False,
+            "message": "Error while generating response. Try again later."
+        })
 
 
 
@@ -1019,8 +1194,7 @@ def create_watch_party():
         username = get_jwt_identity()
 
         # ── Premium check ────────────────────────────────────────
-        subscription = subscriptions_collection.find_one({"username": username})
-        if not subscription:
+        if not watch_party_cache.is_premium(username):
             return jsonify({
                 "success": False,
                 "message": "Only premium members can start a watch party"
@@ -1033,16 +1207,25 @@ def create_watch_party():
         if not movie_id:
             return jsonify({"success": False, "message": "movie_id is required"}), 400
 
-        code = generate_room_code()
-
-        watch_parties_collection.insert_one({
-            "code":       code,
+        party = {
             "movie_id":   movie_id,
             "media_type": media_type,
             "host":       username,
-            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "created_at": datetime.now(),
+            "expires_at": idle_expiry(),
             "active":     True
-        })
+        }
+
+        code = room_code_pool.take() or generate_room_code()
+        try:
+            watch_parties_collection.insert_one({"code": code, **party})
+        except DuplicateKeyError:
+            # Another worker took the same pooled code
+            room_code_pool.record_collision()
+            code = generate_room_code()
+            watch_parties_collection.insert_one({"code": code, **party})
+
+        watch_party_cache.add_party({"code": code, **party})
 
         logger.info(f"Watch party created: code={code} movie_id={movie_id} host={username}")
 
@@ -1072,19 +1255,18 @@ def get_watch_party(code):
         username = get_jwt_identity()
 
         # ── Premium check ────────────────────────────────────────
-        subscription = subscriptions_collection.find_one({"username": username})
-        if not subscription:
+        if not watch_party_cache.is_premium(username):
             return jsonify({
                 "success": False,
                 "message": "Only premium members can join a watch party"
             }), 403
 
-        party = watch_parties_collection.find_one({"code": code}, {"_id": 0})
+        party = watch_party_cache.get_party(code)
 
-        if not party:
+        if party == PARTY_MISSING:
             return jsonify({"success": False, "message": "Watch party not found"}), 404
 
-        if not party.get("active", True):
+        if party == PARTY_ENDED:
             return jsonify({"success": False, "message": "This watch party has ended"}), 410
 
         return jsonify({
@@ -1102,6 +1284,130 @@ def get_watch_party(code):
 
 
 
+# ================================================================
+# ROUTE 3 — Who is in a watch party right now
+# GET /watch-party/<code>/presence
+# ================================================================
+@app.route("/watch-party/<code>/presence", methods=["GET"])
+@jwt_required()
+def get_watch_party_presence(code):
+    logger.info(f"API '/watch-party/{code}/presence' called...!!!")
+    try:
+        username = get_jwt_identity()
+
+        # ── Same access rules as /watch-party/<code> ─────────────
+        if not watch_party_cache.is_premium(username):
+            return jsonify({
+                "success": False,
+                "message": "Only premium members can join a watch party"
+            }), 403
+
+        party = watch_party_cache.get_party(code)
+
+        if party == PARTY_MISSING:
+            return jsonify({"success": False, "message": "Watch party not found"}), 404
+
+        if party == PARTY_ENDED:
+            return jsonify({"success": False, "message": "This watch party has ended"}), 410
+
+        snapshot = presence_snapshot(code)
+        return jsonify({
+            "success": True,
+            "code":    code,
+            "count":   snapshot["count"],
+            "members": snapshot["members"]
+        }), 200
+
+    except Exception as e:
+        logger.exception("Error fetching watch party presence")
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+
+
+# ================================================================
+# SOCKET EVENTS — Playback sync
+# Host emits:  play  { code, token, position? }
+#              pause { code, token, position? }
+#              seek  { code, token, position }
+# Everyone in the room receives "playback_state"
+#   { code, playing, position, server_time, seq }
+# and, while playing, a "sync_tick" every few seconds.
+# Clients emit sync_ping { client_time } and get sync_pong
+#   { client_time, server_time } back to estimate their clock offset.
+# ================================================================
+def handle_playback_action(action, data):
+    code  = data.get("code", "")
+    user  = socket_user(data)
+
+    if not code or not user:
+        return
+
+    state, error = playback_sync.control(code, user["username"], action, data.get("position"))
+    if error:
+        emit("playback_error", {"message": error})
+        return
+
+    emit("playback_state", state, to=code)
+
+
+@socketio.on("play")
+def on_play(data):
+    handle_playback_action("play", data)
+
+
+@socketio.on("pause")
+def on_pause(data):
+    handle_playback_action("pause", data)
+
+
+@socketio.on("seek")
+def on_seek(data):
+    handle_playback_action("seek", data)
+
+
+@socketio.on("sync_ping")
+def on_sync_ping(data):
+    emit("sync_pong", {
+        "client_time": (data or {}).get("client_time"),
+        "server_time": server_time()
+    })
+
+
+# Watch party / premium cache metrics (admin)
+@app.route("/admin/watch-party-cache/stats", methods=["GET"])
+@admin_required
+def watch_party_cache_stats():
+    logger.info("API '/admin/watch-party-cache/stats' called ...!!!")
+    return jsonify(watch_party_cache.stats()), 200
+
+
+# Room code pool metrics (admin)
+@app.route("/admin/room-code-pool/stats", methods=["GET"])
+@admin_required
+def room_code_pool_stats():
+    logger.info("API '/admin/room-code-pool/stats' called ...!!!")
+    return jsonify(room_code_pool.stats()), 200
+
+
+# Socket identity cache metrics (admin)
+@app.route("/admin/socket-auth/stats", methods=["GET"])
+@admin_required
+def socket_auth_stats():
+    logger.info("API '/admin/socket-auth/stats' called ...!!!")
+    return jsonify(socket_identities.stats()), 200
+
+
+# Playback sync metrics (admin)
+@app.route("/admin/playback-sync/stats", methods=["GET"])
+@admin_required
+def playback_sync_stats():
+    logger.info("API '/admin/playback-sync/stats' called ...!!!")
+    return jsonify(playback_sync.stats()), 200
+
+
+
+
 # ================================================================
 # SOCKET EVENT — Host ends the party
 # Frontend emits: { code: "XR7T9", token: "..." }
@@ -1110,18 +1416,22 @@ def get_watch_party(code):
 # ================================================================
 @socketio.on("end_party")
 def on_end_party(data):
-    token = data.get("token", "")
     code  = data.get("code", "")
-    user  = get_user_from_token(token)
+    user  = socket_user(data)
 
-    if not code:
+    if not code or not user:
         return
 
-    # Mark as inactive in DB
-    watch_parties_collection.update_one(
-        {"code": code},
-        {"$set": {"active": False, "ended_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}}
+    # Mark as inactive in DB (only the host of an active party can end it)
+    result = watch_parties_collection.update_one(
+        {"code": code, "host": user["username"], "active": True},
+        {"$set": {"active": False, "ended_at": datetime.now(), "expires_at": ended_expiry()}}
     )
+    if result.matched_count == 0:
+        emit("party_error", {"message": "Only the host can end this watch party"})
+        return
+
+    watch_party_cache.end_party(code)
 
     logger.info(f"Watch party ended: code={code} by host={user['username']}")
 
@@ -1130,6 +1440,10 @@ def on_end_party(data):
         "message": f"{user['username']} has ended the session"
     }, to=code)
 
+    presence.close_room(code)
+    playback_sync.end(code)
+    socketio.close_room(code)
+
 
 
 @app.route("/health", methods=["GET"])
@@ -0,0 +1,179 @@
+import argparse
+import heapq
+import random
+import statistics
+import time
+
+from services.playback_sync_service import PlaybackState
+
+
+# -------------------------------
+# Watch-party drift simulation
+# N clients per room, each with its own clock offset, network latency
+# (base + jitter, asymmetric per direction) and player speed error.
+# The host plays, seeks, pauses and resumes; drift is |client position -
+# authoritative position| sampled every SAMPLE_EVERY seconds, skipping
+# the SETTLE seconds after each host action while it is still in flight.
+#
+#   naive  : clients apply playback_state as-is on receipt, no ticks
+#   synced : sync_ping/pong offset estimate, RTT-compensated positions,
+#            periodic sync_tick corrections
+# -------------------------------
+STEP = 0.05
+SAMPLE_EVERY = 0.1
+SETTLE = 1.0
+CORRECTION_THRESHOLD = 0.1
+PINGS = 5
+
+HOST_SCRIPT = [
+    (0.0, "play", 0.0),
+    (40.0, "seek", 600.0),
+    (75.0, "pause", None),
+    (85.0, "play", None),
+]
+
+
+class Client:
+    def __init__(self, rng):
+        self.rng = rng
+        self.clock_offset = rng.uniform(-2.0, 2.0)      # local clock - server clock
+        self.latency = rng.uniform(0.02, 0.3)           # base one-way latency
+        self.speed = 1 + rng.uniform(-0.002, 0.002)     # player clock error
+        self.position = 0.0
+        self.playing = False
+        self.offset_estimate = 0.0
+
+    def one_way(self):
+        return self.latency + self.rng.expovariate(1 / 0.02)
+
+    def estimate_offset(self, t):
+        """
+        sync_ping / sync_pong: keep the sample with the smallest RTT.
+        """
+        best = None
+        for _ in range(PINGS):
+            up, down = self.one_way(), self.one_way()
+            sent_local = t + self.clock_offset
+            server_time = t + up
+            arrived_local = t + up + down + self.clock_offset
+            rtt = arrived_local - sent_local
+            estimate = arrived_local - rtt / 2 - server_time
+            if best is None or rtt < best[0]:
+                best = (rtt, estimate)
+        self.offset_estimate = best[1]
+
+    def receive(self, t, message, mode):
+        if mode == "naive":
+            if message["event"] != "playback_state":
+                return
+            self.position = message["position"]
+            self.playing = message["playing"]
+            return
+
+        server_now = (t + self.clock_offset) - self.offset_estimate
+        expected = message["position"]
+        if message["playing"]:
+            expected += server_now - message["server_time"]
+
+        if message["event"] == "playback_state" or abs(self.position - expected) > CORRECTION_THRESHOLD:
+            self.position = expected
+        self.playing = message["playing"]
+
+    def advance(self, dt):
+        if self.playing:
+            self.position += dt * self.speed
+
+
+def simulate(mode, clients_per_room, rooms, duration, tick_interval, seed):
+    rng = random.Random(seed)
+    drifts = []
+
+    for room in range(rooms):
+        state = PlaybackState(f"ROOM{room}", "host", updated_at=0.0)
+        clients = [Client(rng) for _ in range(clients_per_room)]
+        for client in clients:
+            client.estimate_offset(0.0)
+
+        inbox = []      # (arrival time, seq, client index, message)
+        seq = 0
+
+        def broadcast(t, event):
+            nonlocal seq
+            message = {
+                "event": event,
+                "playing": state.playing,
+                "position": state.position_at(t),
+                "server_time": t
+            }
+            for index, client in enumerate(clients):
+                seq += 1
+                heapq.heappush(inbox, (t + client.one_way(), seq, index, message))
+
+        script = list(HOST_SCRIPT)
+        next_tick = tick_interval
+        next_sample = 1.0
+        last_action = 0.0
+        t = 0.0
+
+        while t < duration:
+            while script and script[0][0] <= t:
+                _, action, position = script.pop(0)
+                state.position = state.position_at(t) if position is None else position
+                state.updated_at = t
+                if action in ("play", "pause"):
+                    state.playing = action == "play"
+                state.seq += 1
+                last_action = t
+                broadcast(t, "playback_state")
+
+            if mode == "synced" and state.playing and t >= next_tick:
+                broadcast(t, "sync_tick")
+                next_tick = t + tick_interval
+
+            while inbox and inbox[0][0] <= t:
+                arrival, _, index, message = heapq.heappop(inbox)
+                clients[index].receive(arrival, message, mode)
+
+            for client in clients:
+                client.advance(STEP)
+            t += STEP
+
+            if t >= next_sample and t - last_action >= SETTLE:
+                truth = state.position_at(t)
+                drifts.extend(abs(client.position - truth) for client in clients)
+                next_sample = t + SAMPLE_EVERY
+
+    return drifts
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+# Usage: python -m benchmarks.playback_drift [--clients 100] [--rooms 1] [--duration 120]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate watch-party playback drift")
+    parser.add_argument("--clients", type=int, default=100, help="clients per room")
+    parser.add_argument("--rooms", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=120.0, help="simulated seconds")
+    parser.add_argument("--tick-interval", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{args.rooms} room(s) x {args.clients} clients, {args.duration:.0f}s simulated, "
+          f"sync tick every {args.tick_interval}s, {SETTLE:.0f}s settle after host actions excluded")
+    print(f"{'mode':8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'mean ms':>8} {'wall s':>7}")
+    for mode in ("naive", "synced"):
+        started = time.perf_counter()
+        drifts = simulate(mode, args.clients, args.rooms, args.duration, args.tick_interval, args.seed)
+        wall = time.perf_counter() - started
+        print(
+            f"{mode:8} "
+            f"{percentile(drifts, 50) * 1000:8.1f} "
+            f"{percentile(drifts, 90) * 1000:8.1f} "
+            f"{percentile(drifts, 99) * 1000:8.1f} "
+            f"{max(drifts) * 1000:8.1f} "
+            f"{statistics.fmean(drifts) * 1000:8.1f} "
+            f"{wall:7.2f}"
+        )
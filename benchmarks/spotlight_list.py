@@ -0,0 +1,96 @@
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+
+from date_utils import to_datetime, since_filter
+from services.index_service import INDEXES
+from services.spotlight_service import list_group_watch, SpotlightFeed, SPOTLIGHT_WINDOW
+
+
+# -------------------------------
+# /watch-together-list latency vs group_watch size
+#   find + group in Python : the original route, which read every entry of
+#                            the 7-day window and grouped it per call
+#   index page             : list_group_watch, first and a middle page of 50
+#   in-memory page         : SpotlightFeed.page after one sync
+# Runs against a throw-away database on --uri that is dropped afterwards.
+# -------------------------------
+ENTRIES_PER_USER = 5
+
+
+def seed(collection, size, rng):
+    now = datetime.now()
+    users = max(1, size // ENTRIES_PER_USER)
+    docs = [
+        {
+            "username": f"user{rng.randrange(users):07d}",
+            "explore": rng.choice(["movie", "tv"]),
+            "explore_id": i,
+            # ~80% inside the 7-day window
+            "added_at": now - timedelta(hours=rng.uniform(0, 24 * 8.75))
+        }
+        for i in range(size)
+    ]
+    for start in range(0, size, 10000):
+        collection.insert_many(docs[start:start + 10000], ordered=False)
+    collection.create_indexes(INDEXES["group_watch"])
+
+
+def find_and_group(collection, username):
+    cutoff = datetime.now() - SPOTLIGHT_WINDOW
+    user_map = {}
+    for doc in collection.find({"username": {"$ne": username}, **since_filter("added_at", cutoff)}):
+        if to_datetime(doc["added_at"]) < cutoff:
+            continue
+        entry = user_map.setdefault(doc["username"], {"username": doc["username"], "user_movie_list": []})
+        entry["user_movie_list"].append({"explore": doc["explore"], "explore_id": doc["explore_id"]})
+    return list(user_map.values())
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+# Usage: python -m benchmarks.spotlight_list --uri mongodb://localhost:27017 [--sizes 1000,10000,100000]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark /watch-together-list against collection size")
+    parser.add_argument("--uri", required=True, help="MongoDB to create the throw-away database on")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri)
+    db_name = f"bench_spotlight_{uuid.uuid4().hex[:8]}"
+    rng = random.Random(args.seed)
+
+    print(f"{'entries':>9} {'find+group ms':>14} {'first page ms':>14} {'mid page ms':>12} "
+          f"{'in-memory ms':>13} {'sync ms':>8}")
+    try:
+        for size in (int(s) for s in args.sizes.split(",")):
+            collection = client[db_name][f"group_watch_{size}"]
+            seed(collection, size, rng)
+
+            before, _ = timed(lambda: find_and_group(collection, "user0000000"), args.repeats)
+            first, _ = timed(lambda: list_group_watch(collection, "user0000000"), args.repeats)
+            middle_user = f"user{max(1, size // ENTRIES_PER_USER) // 2:07d}"
+            middle, _ = timed(lambda: list_group_watch(collection, "user0000000", after=middle_user), args.repeats)
+
+            feed = SpotlightFeed(collection)
+            sync, _ = timed(feed.sync, 1)
+            in_memory, _ = timed(lambda: feed.page("user0000000"), args.repeats)
+
+            print(f"{size:9d} {before:14.1f} {first:14.1f} {middle:12.1f} {in_memory:13.2f} {sync:8.1f}")
+    finally:
+        client.drop_database(db_name)
+        client.close()
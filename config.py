@@ -34,3 +34,88 @@ class Config:
     CORS_ORIGIN = _decrypt_(os.getenv("CORS_ORIGIN"))
     SENDER_EMAIL = _decrypt_(os.getenv("SENDER_EMAIL"))
     APP_PASSWORD = _decrypt_(os.getenv("APP_PASSWORD"))
+    ADMIN_API_KEY = _decrypt_(os.getenv("ADMIN_API_KEY"))
+
+    # AI movie response cache (in-process LRU in front of the Mongo tier)
+    AI_RESPONSE_CACHE_SIZE = int(os.getenv("AI_RESPONSE_CACHE_SIZE", 512))
+    AI_RESPONSE_CACHE_TTL = int(os.getenv("AI_RESPONSE_CACHE_TTL", 6 * 60 * 60))
+
+    # Quiz question bank
+    QUIZ_BANK_LOW_WATERMARK = int(os.getenv("QUIZ_BANK_LOW_WATERMARK", 50))
+    QUIZ_BANK_TARGET_SIZE = int(os.getenv("QUIZ_BANK_TARGET_SIZE", 200))
+    QUIZ_BANK_REFILL_INTERVAL = int(os.getenv("QUIZ_BANK_REFILL_INTERVAL", 300))
+
+    # Chatbot similarity cache
+    CHATBOT_CACHE_SIZE = int(os.getenv("CHATBOT_CACHE_SIZE", 1024))
+    CHATBOT_CACHE_THRESHOLD = float(os.getenv("CHATBOT_CACHE_THRESHOLD", 0.85))
+
+    # Batch churn scoring (0 disables the in-process schedule; use the CLI/cron instead)
+    CHURN_BATCH_INTERVAL_HOURS = float(os.getenv("CHURN_BATCH_INTERVAL_HOURS", 0))
+
+    # Micro-batched churn inference
+    CHURN_INFERENCE_MAX_BATCH_ROWS = int(os.getenv("CHURN_INFERENCE_MAX_BATCH_ROWS", 64))
+    CHURN_INFERENCE_MAX_WAIT_MS = float(os.getenv("CHURN_INFERENCE_MAX_WAIT_MS", 5))
+    CHURN_INFERENCE_MAX_QUEUE_DEPTH = int(os.getenv("CHURN_INFERENCE_MAX_QUEUE_DEPTH", 1024))
+
+    # Set once migrations/migrate_timestamps.py has converted every string timestamp
+    TIMESTAMPS_MIGRATED = os.getenv("TIMESTAMPS_MIGRATED", "false").lower() == "true"
+
+    # Index bootstrap
+    ENSURE_INDEXES_ON_STARTUP = os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true"
+    OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", 10 * 60))
+
+    # /subscriptions dashboard snapshots
+    DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", 4096))
+    DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", 60))
+
+    # Logins kept on the user document (full history lives in login_history)
+    RECENT_LOGINS_CAP = int(os.getenv("RECENT_LOGINS_CAP", 50))
+
+    # /watch-progress write coalescing
+    WATCH_PROGRESS_FLUSH_INTERVAL = float(os.getenv("WATCH_PROGRESS_FLUSH_INTERVAL", 5))
+    WATCH_PROGRESS_FLUSH_MAX_ENTRIES = int(os.getenv("WATCH_PROGRESS_FLUSH_MAX_ENTRIES", 500))
+
+    # Outbound mail (point SMTP_HOST/SMTP_PORT at a local stand-in server for testing)
+    SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+    SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+    SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+    SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))
+    MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", 2))
+    MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 5))
+    # Sent and dead-lettered outbox rows (bodies redacted) are kept this long
+    MAIL_OUTBOX_RETENTION_SECONDS = int(os.getenv("MAIL_OUTBOX_RETENTION_SECONDS", 24 * 60 * 60))
+
+    # In-memory Spotlight feed (/watch-together-list)
+    SPOTLIGHT_REFRESH_INTERVAL = int(os.getenv("SPOTLIGHT_REFRESH_INTERVAL", 30))
+
+    # Socket.IO message queue (e.g. redis://localhost:6379/0) shared by every
+    # worker; empty keeps rooms and presence local to a single process
+    SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE", "")
+
+    # Watch-party chat limits (token buckets: messages per second / burst size)
+    CHAT_MAX_MESSAGE_LENGTH = int(os.getenv("CHAT_MAX_MESSAGE_LENGTH", 1000))
+    CHAT_SENDER_RATE = float(os.getenv("CHAT_SENDER_RATE", 1))
+    CHAT_SENDER_BURST = int(os.getenv("CHAT_SENDER_BURST", 5))
+    CHAT_ROOM_RATE = float(os.getenv("CHAT_ROOM_RATE", 20))
+    CHAT_ROOM_BURST = int(os.getenv("CHAT_ROOM_BURST", 40))
+    # Rooms at least this large get batched "receive_messages" events (0 disables)
+    CHAT_COALESCE_ROOM_SIZE = int(os.getenv("CHAT_COALESCE_ROOM_SIZE", 50))
+    CHAT_COALESCE_WINDOW_MS = int(os.getenv("CHAT_COALESCE_WINDOW_MS", 250))
+
+    # Seconds between sweeps of ended / empty watch-party rooms
+    PRESENCE_CLEANUP_INTERVAL = int(os.getenv("PRESENCE_CLEANUP_INTERVAL", 300))
+
+    # Seconds between playback sync ticks sent to playing watch parties
+    PLAYBACK_SYNC_TICK_INTERVAL = float(os.getenv("PLAYBACK_SYNC_TICK_INTERVAL", 5))
+
+    # Watch-party lifecycle (TTL on watch_parties.expires_at) and room code pool
+    WATCH_PARTY_IDLE_TTL_HOURS = int(os.getenv("WATCH_PARTY_IDLE_TTL_HOURS", 12))
+    WATCH_PARTY_ENDED_RETENTION_MINUTES = int(os.getenv("WATCH_PARTY_ENDED_RETENTION_MINUTES", 60))
+    ROOM_CODE_POOL_SIZE = int(os.getenv("ROOM_CODE_POOL_SIZE", 200))
+    ROOM_CODE_POOL_REFILL_INTERVAL = int(os.getenv("ROOM_CODE_POOL_REFILL_INTERVAL", 60))
+
+    # Active watch party / premium status cache for /watch-party/<code>
+    WATCH_PARTY_CACHE_SIZE = int(os.getenv("WATCH_PARTY_CACHE_SIZE", 10000))
+    WATCH_PARTY_CACHE_TTL = int(os.getenv("WATCH_PARTY_CACHE_TTL", 60))
+    WATCH_PARTY_NEGATIVE_CACHE_TTL = int(os.getenv("WATCH_PARTY_NEGATIVE_CACHE_TTL", 15))
+    PREMIUM_CACHE_TTL = int(os.getenv("PREMIUM_CACHE_TTL", 300))
@@ -0,0 +1,69 @@
+from datetime import datetime, date
+from config import Config
+
+
+# -------------------------------
+# Legacy string timestamp formats
+# -------------------------------
+LOGIN_FORMAT = "%d-%m-%Y %H:%M:%S"      # users.login_data, user_watched_movies.watched_at
+CREATED_FORMAT = "%Y-%m-%d %H:%M:%S"    # created_at, added_at, ended_at
+DAY_FORMAT = "%Y-%m-%d"                 # users.subscription_valid
+
+LEGACY_FORMATS = (LOGIN_FORMAT, CREATED_FORMAT, DAY_FORMAT)
+
+
+def to_datetime(value):
+    """
+    Reads a timestamp stored either as a native BSON date or as one of the
+    legacy string formats. Empty values come back as None.
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+
+    for fmt in LEGACY_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised timestamp : {value!r}")
+
+
+def format_datetime(value, fmt=CREATED_FORMAT):
+    """
+    Renders a stored timestamp in the string format API clients expect.
+    """
+    value = to_datetime(value)
+    return value.strftime(fmt) if value else value
+
+
+def date_expr(field_path, fmt):
+    """
+    Aggregation expression that yields a date whether the field holds a
+    BSON date or a legacy string (only needed until the migration is done).
+    """
+    if Config.TIMESTAMPS_MIGRATED:
+        return field_path
+
+    return {
+        "$cond": [
+            {"$eq": [{"$type": field_path}, "string"]},
+            {"$dateFromString": {"dateString": field_path, "format": fmt, "onError": None}},
+            field_path
+        ]
+    }
+
+
+def since_filter(field, since):
+    """
+    Query filter for field >= since. Until the migration is done it also
+    lets legacy string values through, so callers must re-check those
+    (with to_datetime or date_expr).
+    """
+    if Config.TIMESTAMPS_MIGRATED:
+        return {field: {"$gte": since}}
+
+    return {"$or": [{field: {"$gte": since}}, {field: {"$type": "string"}}]}
@@ -0,0 +1,51 @@
+import argparse
+from datetime import datetime, UTC
+from pymongo import MongoClient
+
+from config import Config
+from logger import LoggerFactory
+from services.watch_party_service import idle_expiry, ended_expiry
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+def run_backfill(db, dry_run=False) -> dict:
+    """
+    Gives every watch party created before expires_at existed an expiry,
+    so the TTL index removes them too:
+      ended (active: False)  -> now + ended retention
+      still active           -> now + idle TTL (slid forward again on join)
+    Idempotent: only documents without expires_at are touched.
+    """
+    collection = db["watch_parties"]
+    now = datetime.now(UTC)
+    missing = {"expires_at": {"$exists": False}}
+
+    ended_filter = {**missing, "active": False}
+    active_filter = {**missing, "active": {"$ne": False}}
+
+    if dry_run:
+        return {
+            "ended": collection.count_documents(ended_filter),
+            "active": collection.count_documents(active_filter)
+        }
+
+    report = {
+        "ended": collection.update_many(ended_filter, {"$set": {"expires_at": ended_expiry(now)}}).modified_count,
+        "active": collection.update_many(active_filter, {"$set": {"expires_at": idle_expiry(now)}}).modified_count
+    }
+    logger.info(f"Watch party expiry backfill : {report}")
+    return report
+
+
+# Usage: python -m migrations.backfill_party_expiry [--dry-run]
+# One-off for parties created before watch_parties.expires_at; safe to re-run.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Set expires_at on legacy watch parties")
+    parser.add_argument("--dry-run", action="store_true", help="only count the documents to update")
+    args = parser.parse_args()
+
+    db = MongoClient(Config.MONGO_URI).get_default_database()
+    report = run_backfill(db, args.dry_run)
+    print(f"{'would update' if args.dry_run else 'updated'} : {report}")
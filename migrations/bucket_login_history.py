@@ -0,0 +1,125 @@
+import argparse
+from collections import defaultdict
+from pymongo import MongoClient, UpdateOne
+
+from config import Config
+from logger import LoggerFactory
+from date_utils import to_datetime
+from services.login_history_service import bucket_id, month_key
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+def user_size_report(db) -> dict:
+    """
+    Distribution of BSON sizes (bytes) of documents in "users".
+    """
+    sizes = sorted(
+        doc["size"] for doc in db["users"].aggregate([
+            {"$project": {"_id": 0, "size": {"$bsonSize": "$$ROOT"}}}
+        ])
+    )
+    if not sizes:
+        return {"count": 0}
+
+    def percentile(p):
+        return sizes[min(len(sizes) - 1, int(len(sizes) * p / 100))]
+
+    return {
+        "count": len(sizes),
+        "avg": round(sum(sizes) / len(sizes)),
+        "p50": percentile(50),
+        "p90": percentile(90),
+        "p99": percentile(99),
+        "max": sizes[-1]
+    }
+
+
+def _parse_logins(values):
+    logins = []
+    for value in values or []:
+        try:
+            login_at = to_datetime(value)
+        except ValueError:
+            logger.warning(f"Skipping unparseable login timestamp : {value!r}")
+            continue
+        if login_at:
+            logins.append(login_at)
+    return sorted(logins)
+
+
+def migrate_user(db, user):
+    logins = _parse_logins(user.get("login_data"))
+
+    by_month = defaultdict(list)
+    for login_at in logins:
+        by_month[month_key(login_at)].append(login_at)
+
+    # $addToSet keeps a re-run after a crash from duplicating logins
+    operations = [
+        UpdateOne(
+            {"_id": bucket_id(user["username"], month_logins[0])},
+            {
+                "$addToSet": {"logins": {"$each": month_logins}},
+                "$setOnInsert": {"username": user["username"], "month": month}
+            },
+            upsert=True
+        )
+        for month, month_logins in by_month.items()
+    ]
+    if operations:
+        db["login_history"].bulk_write(operations, ordered=False)
+
+    update = {"$unset": {"login_data": ""}}
+    if logins:
+        recent = sorted(set(logins + _parse_logins(user.get("recent_logins"))))
+        update["$set"] = {
+            "recent_logins": recent[-Config.RECENT_LOGINS_CAP:],
+            "last_login": recent[-1]
+        }
+    db["users"].update_one({"_id": user["_id"]}, update)
+
+
+def run_migration(db, batch_size=200):
+    migrated = 0
+    failed = 0
+    query = {"login_data": {"$exists": True}}
+
+    while True:
+        # Users drop out of this query once migrated, so a re-run resumes where it stopped
+        users = list(db["users"].find(
+            query,
+            {"username": 1, "login_data": 1, "recent_logins": 1}
+        ).sort("_id", 1).limit(batch_size))
+        if not users:
+            break
+
+        for user in users:
+            try:
+                migrate_user(db, user)
+                migrated += 1
+            except Exception:
+                logger.exception(f"Failed to migrate login history for {user.get('username')}")
+                failed += 1
+
+        query["_id"] = {"$gt": users[-1]["_id"]}
+        logger.info(f"Migrated login history for {migrated} users ({failed} failed)")
+
+    return migrated
+
+
+# Usage: python -m migrations.bucket_login_history [--batch-size 200] [--report-only]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move users.login_data into monthly login_history buckets")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--report-only", action="store_true")
+    args = parser.parse_args()
+
+    db = MongoClient(Config.MONGO_URI).get_default_database()
+
+    print(f"users document size before (bytes) : {user_size_report(db)}")
+    if not args.report_only:
+        migrated = run_migration(db, args.batch_size)
+        print(f"migrated users : {migrated}")
+        print(f"users document size after (bytes)  : {user_size_report(db)}")
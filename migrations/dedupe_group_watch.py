@@ -0,0 +1,60 @@
+import argparse
+from datetime import datetime
+from pymongo import MongoClient
+
+from config import Config
+from date_utils import to_datetime
+from logger import LoggerFactory
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+def _added_at(doc):
+    try:
+        return to_datetime(doc.get("added_at")) or datetime.min
+    except (TypeError, ValueError):
+        return datetime.min
+
+
+def run_dedupe(db, dry_run=False) -> dict:
+    """
+    Keeps the most recently added group_watch entry per (username,
+    explore, explore_id) and deletes the rest, so the
+    username_explore_unique index can be built. Idempotent: once the
+    keys are unique there is nothing left to delete.
+    """
+    collection = db["group_watch"]
+    groups = collection.aggregate([
+        {"$group": {
+            "_id": {"username": "$username", "explore": "$explore", "explore_id": "$explore_id"},
+            "docs": {"$push": {"_id": "$_id", "added_at": "$added_at"}},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True)
+
+    report = {"keys": 0, "duplicates": 0, "deleted": 0}
+    for group in groups:
+        stale = [doc["_id"] for doc in sorted(group["docs"], key=_added_at, reverse=True)[1:]]
+        report["keys"] += 1
+        report["duplicates"] += len(stale)
+        if not dry_run:
+            report["deleted"] += collection.delete_many({"_id": {"$in": stale}}).deleted_count
+
+    if not dry_run:
+        logger.info(f"group_watch dedupe : {report}")
+    return report
+
+
+# Usage: python -m migrations.dedupe_group_watch [--dry-run]
+# Run before group_watch.username_explore_unique can be built; then re-run
+# python -m services.index_service (or restart the app) to create it.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove duplicate group_watch entries")
+    parser.add_argument("--dry-run", action="store_true", help="only count the entries to delete")
+    args = parser.parse_args()
+
+    db = MongoClient(Config.MONGO_URI).get_default_database()
+    report = run_dedupe(db, args.dry_run)
+    print(f"{'would delete' if args.dry_run else 'deleted'} : {report}")
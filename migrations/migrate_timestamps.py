@@ -0,0 +1,182 @@
+import argparse
+import sys
+import time
+from pymongo import MongoClient, UpdateOne
+
+from config import Config
+from logger import LoggerFactory
+from date_utils import to_datetime
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+# -------------------------------
+# Fields to convert from strings to BSON dates
+# (collection, field path, layout)
+#   scalar        : the field itself is a timestamp
+#   array         : an array of timestamps
+#   array_of_docs : "<array>.<key>" inside an array of sub-documents
+# -------------------------------
+MIGRATIONS = [
+    ("users", "login_data", "array"),
+    ("users", "subscription_valid", "scalar"),
+    ("user_watched_movies", "watched_at", "scalar"),
+    ("subscriptions", "watched_movies.created_at", "array_of_docs"),
+    ("group_watch", "added_at", "scalar"),
+    ("watch_parties", "created_at", "scalar"),
+    ("watch_parties", "ended_at", "scalar"),
+]
+
+CHECKPOINT_COLLECTION = "migration_checkpoints"
+
+
+def _convert(value):
+    return to_datetime(value) if isinstance(value, str) else value
+
+
+def _migrated_value(doc, field, layout):
+    """
+    Returns (root field, old value, new value) for one document.
+    """
+    if layout == "array_of_docs":
+        root, key = field.split(".", 1)
+        old = doc.get(root) or []
+        new = [
+            {**item, key: _convert(item.get(key))} if isinstance(item, dict) else item
+            for item in old
+        ]
+        return root, old, new
+
+    old = doc.get(field)
+    if layout == "array":
+        return field, old, [_convert(v) for v in old or []]
+    return field, old, _convert(old)
+
+
+def count_remaining(db, collection_name, field):
+    return db[collection_name].count_documents({field: {"$type": "string"}})
+
+
+def migrate_field(db, collection_name, field, layout, batch_size=500, dry_run=False, max_passes=3):
+    """
+    Converts one field, resuming after the checkpointed _id. Once a pass
+    reaches the end of the collection, the next pass starts again from the
+    beginning so that documents skipped by the concurrent-change guard, or
+    written as strings by older workers meanwhile, are picked up too.
+    Returns this run's counts and what is still left as strings.
+    """
+    checkpoints = db[CHECKPOINT_COLLECTION]
+    checkpoint_id = f"timestamps:{collection_name}.{field}"
+    checkpoint = checkpoints.find_one({"_id": checkpoint_id}) or {}
+
+    collection = db[collection_name]
+    root = field.split(".", 1)[0]
+    start_id = checkpoint.get("last_id")
+
+    converted = 0
+    failed = 0
+    remaining = None
+
+    for _ in range(max_passes):
+        query = {field: {"$type": "string"}}
+        if start_id is not None:
+            query["_id"] = {"$gt": start_id}
+
+        while True:
+            docs = list(collection.find(query, {root: 1}).sort("_id", 1).limit(batch_size))
+            if not docs:
+                break
+
+            operations = []
+            for doc in docs:
+                try:
+                    root_field, old, new = _migrated_value(doc, field, layout)
+                except ValueError:
+                    logger.exception(f"Skipping {collection_name} {doc['_id']} : unparseable {field}")
+                    failed += 1
+                    continue
+
+                # Only overwrite when nobody changed the value in the meantime
+                operations.append(UpdateOne(
+                    {"_id": doc["_id"], root_field: old},
+                    {"$set": {root_field: new}}
+                ))
+
+            batch_converted = 0
+            if operations and not dry_run:
+                batch_converted = collection.bulk_write(operations, ordered=False).modified_count
+            elif dry_run:
+                batch_converted = len(operations)
+            converted += batch_converted
+
+            query["_id"] = {"$gt": docs[-1]["_id"]}
+            if not dry_run:
+                checkpoints.update_one(
+                    {"_id": checkpoint_id},
+                    {
+                        "$set": {"last_id": docs[-1]["_id"]},
+                        "$inc": {"converted_total": batch_converted}
+                    },
+                    upsert=True
+                )
+
+            logger.info(f"{collection_name}.{field} : {converted} converted, {failed} failed")
+
+        # Pass reached the end: the next one (and the next run) starts from the top
+        if not dry_run:
+            checkpoints.update_one({"_id": checkpoint_id}, {"$unset": {"last_id": ""}}, upsert=True)
+
+        remaining = count_remaining(db, collection_name, field)
+        if dry_run or remaining == 0 or remaining <= failed:
+            # Nothing left, or only values that cannot be parsed
+            break
+        start_id = None
+
+    return {"converted": converted, "failed": failed, "remaining": remaining}
+
+
+def run_migration(db, batch_size=500, dry_run=False, reset=False):
+    """
+    Returns (done, report). done is only True when no field of any
+    migrated collection still holds a string timestamp.
+    """
+    if reset:
+        db[CHECKPOINT_COLLECTION].delete_many({"_id": {"$regex": "^timestamps:"}})
+
+    report = {}
+    started = time.perf_counter()
+    for collection_name, field, layout in MIGRATIONS:
+        report[f"{collection_name}.{field}"] = migrate_field(
+            db, collection_name, field, layout, batch_size, dry_run
+        )
+
+    # Final check, independent of checkpoints and of this run's counters
+    leftovers = {
+        f"{collection_name}.{field}": count_remaining(db, collection_name, field)
+        for collection_name, field, _ in MIGRATIONS
+    }
+    leftovers = {key: count for key, count in leftovers.items() if count}
+    done = not dry_run and not leftovers
+
+    logger.info(f"Timestamp migration finished in {time.perf_counter() - started:.1f}s : {report}")
+    if done:
+        logger.info("No string timestamps left : TIMESTAMPS_MIGRATED=true can be set")
+    else:
+        logger.error(f"NOT done, string timestamps remain : {leftovers}. Keep TIMESTAMPS_MIGRATED=false")
+    return done, report
+
+
+# Usage: python -m migrations.migrate_timestamps [--batch-size 500] [--dry-run] [--reset]
+# Safe to stop and re-run: progress is checkpointed per field.
+# Only set TIMESTAMPS_MIGRATED=true once it exits 0 ("No string timestamps left").
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert string timestamps to BSON dates")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--reset", action="store_true", help="ignore saved checkpoints")
+    args = parser.parse_args()
+
+    db = MongoClient(Config.MONGO_URI).get_default_database()
+    done, _ = run_migration(db, args.batch_size, args.dry_run, args.reset)
+    sys.exit(0 if done else 1)
@@ -1,33 +1,101 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from flask import current_app, jsonify
+from flask import jsonify
+from bson.binary import Binary
+from datetime import datetime, UTC
 from logger import LoggerFactory
+from config import Config
+from cache import TTLCache
+from services.llm_service import register_chain, invoke_chain
+import zstandard
 import json
 import re
 
 logger = LoggerFactory.get_logger(__name__)
 
 
-def extract_json(raw: str) -> dict:
-    match = re.search(r"```(?:json)?\s*([\s\S]*?)```", raw)
-    if not match:
-        raise ValueError("No JSON block found in LLM response")
-    return json.loads(match.group(1))
+# -------------------------------
+# Response cache
+# Tier 1 : in-process LRU with TTL
+# Tier 2 : Mongo collection with zstd-compressed payloads
+# -------------------------------
+ZSTD_LEVEL = 10
 
+_response_cache = TTLCache(
+    maxsize=Config.AI_RESPONSE_CACHE_SIZE,
+    ttl=Config.AI_RESPONSE_CACHE_TTL
+)
+_mongo_hits = 0
+_mongo_misses = 0
 
-def get_ai_movie_response(movie_name, release_date):
-    logger.info("Generating movie's AI Response")
 
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        temperature=0.3,
-        google_api_key=current_app.config["GOOGLE_API_KEY"]
-    )
+def _cache_key(movie_name: str, release_date: str) -> str:
+    return f"{movie_name.strip().lower()}|{release_date.strip()}"
+
+
+def _load_cached_response(cache_collection, key: str):
+    global _mongo_hits, _mongo_misses
+
+    data = _response_cache.get(key)
+    if data is not None:
+        return data
+
+    doc = cache_collection.find_one({"_id": key}, {"payload": 1})
+    if not doc:
+        _mongo_misses += 1
+        return None
 
-    prompt = PromptTemplate(
-        input_variables=["movie_name", "release_date"],
-        template="""
+    _mongo_hits += 1
+    data = json.loads(zstandard.decompress(doc["payload"]))
+    _response_cache.set(key, data)
+    return data
+
+
+def _store_cached_response(cache_collection, key: str, data: dict):
+    _response_cache.set(key, data)
+
+    payload = zstandard.compress(json.dumps(data).encode("utf-8"), ZSTD_LEVEL)
+    try:
+        cache_collection.update_one(
+            {"_id": key},
+            {"$set": {"payload": Binary(payload), "created_at": datetime.now(UTC)}},
+            upsert=True
+        )
+    except Exception:
+        # Cache write failures must never fail the request
+        logger.exception("Failed to persist AI movie response in cache")
+
+
+def purge_ai_response_cache(cache_collection, movie_name=None, release_date=None) -> dict:
+    """
+    Purges a single (movie_name, release_date) entry when both are given,
+    otherwise empties both cache tiers.
+    """
+    if movie_name and release_date:
+        key = _cache_key(movie_name, release_date)
+        _response_cache.pop(key)
+        deleted = cache_collection.delete_one({"_id": key}).deleted_count
+        return {"memory_purged": 1, "mongo_purged": deleted}
+
+    memory_purged = _response_cache.clear()
+    mongo_purged = cache_collection.delete_many({}).deleted_count
+    return {"memory_purged": memory_purged, "mongo_purged": mongo_purged}
+
+
+def get_ai_response_cache_stats() -> dict:
+    lookups = _mongo_hits + _mongo_misses
+    return {
+        "memory": _response_cache.stats(),
+        "mongo": {
+            "hits": _mongo_hits,
+            "misses": _mongo_misses,
+            "hit_rate": round(_mongo_hits / lookups, 3) if lookups else 0.0
+        }
+    }
+
+
+MOVIE_ANALYZE_PROMPT = PromptTemplate(
+    input_variables=["movie_name", "release_date"],
+    template="""
 You are a movie expert and a strict JSON formatter.
 
 You will be given:
@@ -56,13 +124,40 @@ Formatting rules (MANDATORY):
         }}
     }}
     """
-    )
+)
+
+register_chain("movie_analyze", MOVIE_ANALYZE_PROMPT, temperature=0.3)
+
 
-    # LangChain Expression Language (LCEL)
-    chain = prompt | llm | StrOutputParser()
+def extract_json(raw: str) -> dict:
+    match = re.search(r"```(?:json)?\s*([\s\S]*?)```", raw)
+    if not match:
+        raise ValueError("No JSON block found in LLM response")
+    return json.loads(match.group(1))
+
+
+def get_ai_movie_response(movie_name, release_date, cache_collection):
+    key = _cache_key(movie_name, release_date)
+
+    try:
+        cached = _load_cached_response(cache_collection, key)
+    except Exception:
+        logger.exception("AI movie response cache lookup failed")
+        cached = None
+
+    if cached is not None:
+        logger.info("Serving movie's AI Response from cache")
+        return jsonify({
+            "movie_name": movie_name,
+            "release_date": release_date,
+            "description": cached["description"],
+            "box_office_data": cached["box_office_data"]
+        }), 201
+
+    logger.info("Generating movie's AI Response")
 
     try:
-        result = chain.invoke({
+        result = invoke_chain("movie_analyze", {
             "movie_name": movie_name,
             "release_date": release_date
         })
@@ -76,6 +171,11 @@ Formatting rules (MANDATORY):
         description = data["description"]
         box_office_data = data["box_office_data"]
 
+        _store_cached_response(cache_collection, key, {
+            "description": description,
+            "box_office_data": box_office_data
+        })
+
         return jsonify({
             "movie_name": movie_name,
             "release_date": release_date,
@@ -0,0 +1,165 @@
+import threading
+import time
+from logger import LoggerFactory
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+# -------------------------------
+# Watch-party chat: throttling and fan-out
+# Every accepted message costs one delivery per member of the room, so
+# senders and rooms are rate limited and large rooms can be switched to
+# batched "receive_messages" events.
+# -------------------------------
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def consume(self, now: float) -> bool:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ChatLimiter:
+    """
+    Per-sid and per-room token buckets plus a maximum message length.
+    Buckets are per process; with several workers each one enforces
+    the limits for the sockets it owns.
+    """
+
+    IDLE_SECONDS = 600
+
+    def __init__(self, max_length=1000, sid_rate=1.0, sid_burst=5, room_rate=20.0, room_burst=40):
+        self.max_length = max_length
+        self.sid_rate = sid_rate
+        self.sid_burst = sid_burst
+        self.room_rate = room_rate
+        self.room_burst = room_burst
+        self._sid_buckets = {}
+        self._room_buckets = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+        self.accepted = 0
+        self.dropped = {"too_long": 0, "sender_rate": 0, "room_rate": 0}
+
+    def check(self, sid, room, message):
+        """
+        Returns None when the message may be sent, otherwise the drop reason.
+        """
+        if len(message) > self.max_length:
+            reason = "too_long"
+        else:
+            now = time.monotonic()
+            with self._lock:
+                sid_bucket = self._sid_buckets.get(sid)
+                if sid_bucket is None:
+                    sid_bucket = self._sid_buckets[sid] = TokenBucket(self.sid_rate, self.sid_burst)
+                room_bucket = self._room_buckets.get(room)
+                if room_bucket is None:
+                    room_bucket = self._room_buckets[room] = TokenBucket(self.room_rate, self.room_burst)
+
+                if not sid_bucket.consume(now):
+                    reason = "sender_rate"
+                elif not room_bucket.consume(now):
+                    reason = "room_rate"
+                else:
+                    reason = None
+
+                if now - self._last_prune > self.IDLE_SECONDS:
+                    self._prune(now)
+
+        if reason:
+            self.dropped[reason] += 1
+        else:
+            self.accepted += 1
+        return reason
+
+    def forget_sid(self, sid):
+        with self._lock:
+            self._sid_buckets.pop(sid, None)
+
+    def _prune(self, now):
+        for buckets in (self._sid_buckets, self._room_buckets):
+            for key in [k for k, b in buckets.items() if now - b.updated > self.IDLE_SECONDS]:
+                del buckets[key]
+        self._last_prune = now
+
+    def stats(self) -> dict:
+        return {
+            "max_length": self.max_length,
+            "accepted": self.accepted,
+            "dropped": dict(self.dropped),
+            "tracked_sids": len(self._sid_buckets),
+            "tracked_rooms": len(self._room_buckets)
+        }
+
+
+class ChatBroadcaster:
+    """
+    Emits chat messages to a room. Rooms with at least coalesce_room_size
+    members get the messages of a coalesce_window_ms window as a single
+    "receive_messages" event instead of one "receive_message" each.
+    coalesce_room_size = 0 disables coalescing.
+    """
+
+    def __init__(self, socketio, coalesce_room_size=50, coalesce_window_ms=250):
+        self.socketio = socketio
+        self.coalesce_room_size = coalesce_room_size
+        self.window = coalesce_window_ms / 1000
+        self._pending = {}      # room -> (messages, room_size)
+        self._lock = threading.Lock()
+        self.events_emitted = 0
+        self.messages_sent = 0
+        self.deliveries = 0     # sum of room sizes over emitted events
+        self.batches = 0
+
+    def send(self, room, payload, room_size):
+        if not self.coalesce_room_size or room_size < self.coalesce_room_size:
+            self.socketio.emit("receive_message", payload, to=room)
+            self._count(1, room_size)
+            return
+
+        with self._lock:
+            pending = self._pending.get(room)
+            if pending is not None:
+                pending[0].append(payload)
+                self._pending[room] = (pending[0], room_size)
+                return
+            self._pending[room] = ([payload], room_size)
+
+        self.socketio.start_background_task(self._flush_later, room)
+
+    def _flush_later(self, room):
+        self.socketio.sleep(self.window)
+        with self._lock:
+            messages, room_size = self._pending.pop(room, ([], 0))
+        if not messages:
+            return
+
+        self.socketio.emit("receive_messages", {"messages": messages}, to=room)
+        self.batches += 1
+        self._count(len(messages), room_size)
+
+    def _count(self, messages, room_size):
+        self.events_emitted += 1
+        self.messages_sent += messages
+        self.deliveries += room_size
+
+    def stats(self) -> dict:
+        return {
+            "coalesce_room_size": self.coalesce_room_size,
+            "coalesce_window_ms": int(self.window * 1000),
+            "events_emitted": self.events_emitted,
+            "messages_sent": self.messages_sent,
+            "deliveries": self.deliveries,
+            "batches": self.batches,
+            "avg_batch_size": round(self.messages_sent / self.events_emitted, 2) if self.events_emitted else 0.0,
+            "pending_rooms": len(self._pending)
+        }
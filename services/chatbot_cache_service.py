@@ -0,0 +1,202 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from config import Config
+from logger import LoggerFactory
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+# -------------------------------
+# Query normalization
+# "sad movie under 2 hours" and "sad movies under two hours"
+# both normalize to ["2", "hour", "sad", "under"]
+# -------------------------------
+NUMBER_WORDS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+    "fifteen": "15", "twenty": "20", "thirty": "30", "forty": "40",
+    "fifty": "50", "sixty": "60", "ninety": "90", "hundred": "100"
+}
+
+SYNONYMS = {
+    "hr": "hour", "hrs": "hour", "h": "hour",
+    "min": "minute", "mins": "minute",
+    "movies": "movie", "films": "film",
+    "romcom": "romantic",
+    "funny": "comedy"
+}
+
+# Filler words that do not change which movies should be recommended.
+# Negations and runtime words ("under", "less", "not") are deliberately kept.
+STOPWORDS = {
+    "a", "an", "the", "some", "any", "me", "i", "im", "to", "for", "of",
+    "with", "that", "is", "are", "be", "please", "pls", "can", "could",
+    "you", "give", "show", "recommend", "suggest", "suggestion",
+    "recommendation", "want", "wanna", "watch", "like", "movie", "film",
+    "good", "best", "and", "or", "in", "on", "my", "something"
+}
+
+
+# Words that decide which movies fit. Two queries that differ in any of
+# these (or in a number) never share a reply, however similar the rest is.
+DISCRIMINATIVE = {
+    # mood
+    "happy", "sad", "dark", "light", "feel", "uplifting", "depressing",
+    "emotional", "scary", "creepy", "cozy", "wholesome", "intense",
+    "relaxing", "heartwarming", "tragic", "bittersweet", "hopeful",
+    # genre
+    "comedy", "drama", "horror", "thriller", "action", "romance", "romantic",
+    "animated", "animation", "documentary", "sci", "fi", "scifi", "fantasy",
+    "mystery", "crime", "war", "western", "musical", "family", "kid",
+    "adventure", "superhero", "biopic", "anime", "noir", "slasher",
+    # runtime / negation
+    "under", "over", "less", "more", "than", "short", "long", "not", "no",
+    "without", "hour", "minute"
+}
+
+
+def _is_discriminative(token: str) -> bool:
+    return token in DISCRIMINATIVE or any(ch.isdigit() for ch in token)
+
+
+def _stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def normalize_query(query: str) -> list:
+    text = re.sub(r"[^a-z0-9\s]", " ", query.lower())
+    tokens = []
+    for token in text.split():
+        token = NUMBER_WORDS.get(token, token)
+        token = SYNONYMS.get(token, token)
+        token = _stem(token)
+        token = SYNONYMS.get(token, token)
+        if token not in STOPWORDS:
+            tokens.append(token)
+    return sorted(tokens)
+
+
+class QuerySimilarityCache:
+    """
+    Bounded LRU of chatbot replies with a local TF-IDF similarity index.
+    A lookup returns the reply of the most similar cached query when the
+    cosine similarity reaches the configured threshold and both queries
+    agree on every mood, genre, runtime and number token.
+    """
+
+    HISTOGRAM_BUCKETS = 10
+
+    def __init__(self, maxsize: int = 1024, threshold: float = 0.85):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self._entries = OrderedDict()   # normalized key -> (term counts, reply)
+        self._doc_freq = Counter()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0       # candidates skipped for a differing mood/genre/number
+        self.similarity_histogram = [0] * self.HISTOGRAM_BUCKETS
+
+    def _idf(self, term: str) -> float:
+        return math.log((len(self._entries) + 1) / (self._doc_freq[term] + 1)) + 1
+
+    def _vector(self, counts: Counter) -> dict:
+        vector = {term: count * self._idf(term) for term, count in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {term: w / norm for term, w in vector.items()}
+
+    def _record(self, similarity: float, hit: bool):
+        bucket = min(int(similarity * self.HISTOGRAM_BUCKETS), self.HISTOGRAM_BUCKETS - 1)
+        self.similarity_histogram[bucket] += 1
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def lookup(self, query: str):
+        tokens = normalize_query(query)
+        if not tokens:
+            return None
+        key = " ".join(tokens)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._record(1.0, True)
+                return entry[1]
+
+            query_vector = self._vector(Counter(tokens))
+            best_key, best_similarity = None, 0.0
+            for cached_key, (counts, _) in self._entries.items():
+                if not query_vector.keys() & counts.keys():
+                    continue
+                if any(_is_discriminative(t) for t in query_vector.keys() ^ counts.keys()):
+                    self.rejected += 1
+                    continue
+                cached_vector = self._vector(counts)
+                similarity = sum(w * cached_vector.get(term, 0.0) for term, w in query_vector.items())
+                if similarity > best_similarity:
+                    best_key, best_similarity = cached_key, similarity
+
+            hit = best_key is not None and best_similarity >= self.threshold
+            self._record(best_similarity, hit)
+            if not hit:
+                return None
+
+            self._entries.move_to_end(best_key)
+            logger.info(f"Chatbot cache hit for '{query}' (similarity {best_similarity:.3f})")
+            return self._entries[best_key][1]
+
+    def add(self, query: str, reply: str):
+        tokens = normalize_query(query)
+        if not tokens or not reply:
+            return
+        key = " ".join(tokens)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._entries[key] = (self._entries[key][0], reply)
+                return
+
+            counts = Counter(tokens)
+            self._entries[key] = (counts, reply)
+            self._doc_freq.update(counts.keys())
+
+            while len(self._entries) > self.maxsize:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._doc_freq.subtract(evicted.keys())
+                self._doc_freq += Counter()  # drop zero counts
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        width = 1 / self.HISTOGRAM_BUCKETS
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "rejected_candidates": self.rejected,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "similarity_histogram": {
+                f"{i * width:.1f}-{(i + 1) * width:.1f}": count
+                for i, count in enumerate(self.similarity_histogram)
+            }
+        }
+
+
+chatbot_cache = QuerySimilarityCache(
+    maxsize=Config.CHATBOT_CACHE_SIZE,
+    threshold=Config.CHATBOT_CACHE_THRESHOLD
+)
@@ -1,46 +1,20 @@
 
 import json
 import re
-from flask import current_app, jsonify
-from langchain_google_genai import ChatGoogleGenerativeAI
+from flask import jsonify
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 from logger import LoggerFactory
+from services.llm_service import register_chain, invoke_chain, stream_chain
+from services.chatbot_cache_service import chatbot_cache
 
 logger = LoggerFactory.get_logger(__name__)
 
 
-def extract_json(raw: str) -> dict:
-    """
-    Extract JSON from LLM output. Handles triple backticks.
-    Fallbacks to plain json.loads if no backticks found.
-    """
-    match = re.search(r"```(?:json)?\s*([\s\S]*?)```", raw)
-    try:
-        if match:
-            return json.loads(match.group(1))
-        else:
-            return json.loads(raw)
-    except json.JSONDecodeError as e:
-        logger.exception(f"Failed to parse JSON from LLM output:\n{raw}")
-        raise ValueError("Invalid JSON format from LLM") from e
-
-
-def chatbot(user_query: str):
-    logger.info(f"Generating movie recommendations for query: {user_query}")
-
-    try:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.3,
-            google_api_key=current_app.config["GOOGLE_API_KEY"]
-        )
-
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    """
+CHATBOT_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """
                     You are a Movie Recommendation Chatbot.
 
 Your purpose is to greet users and recommend movies based on their query. You must ONLY respond to greetings or movie-related requests. If the user asks anything unrelated to movies, politely refuse and say you can only help with movie recommendations.
@@ -84,21 +58,52 @@ If no runtime is requested:
 
 Your responses must always remain concise and strictly follow the output format.
                     """
-                ),
-                ("human", "{user_query}")
-            ]
-        )
+        ),
+        ("human", "{user_query}")
+    ]
+)
+
+register_chain("chatbot", CHATBOT_PROMPT, temperature=0.3)
+
+
+def extract_json(raw: str) -> dict:
+    """
+    Extract JSON from LLM output. Handles triple backticks.
+    Fallbacks to plain json.loads if no backticks found.
+    """
+    match = re.search(r"```(?:json)?\s*([\s\S]*?)```", raw)
+    try:
+        if match:
+            return json.loads(match.group(1))
+        else:
+            return json.loads(raw)
+    except json.JSONDecodeError as e:
+        logger.exception(f"Failed to parse JSON from LLM output:\n{raw}")
+        raise ValueError("Invalid JSON format from LLM") from e
+
 
-        # LCEL chain: prompt | llm | StrOutputParser
-        chain = prompt | llm | StrOutputParser()
-        result = chain.invoke({"user_query": user_query})
+def chatbot(user_query: str):
+    logger.info(f"Generating movie recommendations for query: {user_query}")
+
+    try:
+        cached = chatbot_cache.lookup(user_query)
+        if cached is not None:
+            return jsonify({
+                "success": True,
+                "reply": cached
+            }), 200
+
+        result = invoke_chain("chatbot", {"user_query": user_query})
 
         logger.info(f"LLM plain text output: {result}")
 
+        reply = result.strip()  # remove extra whitespace
+        chatbot_cache.add(user_query, reply)
+
         # Since output is plain text, return it directly
         return jsonify({
             "success": True,
-            "reply": result.strip()  # remove extra whitespace
+            "reply": reply
         }), 200
 
     except Exception as e:
@@ -106,4 +111,27 @@ Your responses must always remain concise and strictly follow the output format.
         return jsonify({
             "success": False,
             "message": "Error while generating response. Try again later."
-        }), 500
\ No newline at end of file
+        }), 500
+
+
+def chatbot_stream(user_query: str):
+    """
+    Streaming variant of chatbot(): yields partial reply text as soon as
+    the model produces it. Errors propagate to the caller, which decides
+    how to report them on its transport.
+    """
+    logger.info(f"Streaming movie recommendations for query: {user_query}")
+
+    cached = chatbot_cache.lookup(user_query)
+    if cached is not None:
+        yield cached
+        return
+
+    reply = []
+    for chunk in stream_chain("chatbot", {"user_query": user_query}):
+        if chunk:
+            reply.append(chunk)
+            yield chunk
+
+    logger.info(f"LLM streamed output: {''.join(reply)}")
+    chatbot_cache.add(user_query, "".join(reply).strip())
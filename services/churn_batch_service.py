@@ -0,0 +1,160 @@
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from pymongo import UpdateOne
+
+from logger import LoggerFactory
+from services.predict_churn_service import (
+    db, model, login_collection, feature_collection,
+    rebuild_features, build_features, features_to_row, PREDICTION_THRESHOLD
+)
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+score_collection = db["churn_scores"]
+
+DEFAULT_CHUNK_SIZE = 1000
+
+_scheduler_thread = None
+
+
+# -------------------------------
+# Helper: Group streamed usernames into chunks
+# -------------------------------
+def _chunks(cursor, size):
+    chunk = []
+    for doc in cursor:
+        chunk.append(doc["username"])
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# -------------------------------
+# Score one chunk with a single predict_proba call
+# -------------------------------
+def score_chunk(usernames, now):
+    feature_docs = {
+        doc["username"]: doc
+        for doc in feature_collection.find({"username": {"$in": usernames}})
+    }
+
+    features_list = []
+    for username in usernames:
+        features_doc = feature_docs.get(username)
+        if not features_doc or not features_doc.get("seeded"):
+            features_doc = rebuild_features(username, now)
+        features, _ = build_features(features_doc, now)
+        features_list.append(features)
+
+    matrix = np.array([features_to_row(f) for f in features_list], dtype=float)
+    probabilities = model.predict_proba(matrix)[:, 1]
+
+    return features_list, probabilities
+
+
+# -------------------------------
+# Batch job: score every subscriber
+# -------------------------------
+def run_batch_scoring(chunk_size=DEFAULT_CHUNK_SIZE):
+    logger.info("Batch churn scoring started")
+
+    started = time.perf_counter()
+    now = datetime.now()
+    scored = 0
+
+    cursor = login_collection.find(
+        {"taken_subscription": True},
+        {"_id": 0, "username": 1},
+        batch_size=chunk_size
+    )
+
+    for usernames in _chunks(cursor, chunk_size):
+        features_list, probabilities = score_chunk(usernames, now)
+
+        operations = []
+        for username, features, probability in zip(usernames, features_list, probabilities):
+            prediction = int(probability > PREDICTION_THRESHOLD)
+            operations.append(UpdateOne(
+                {"username": username},
+                {"$set": {
+                    "username": username,
+                    "features": {
+                        **features,
+                        "avgCompletionRate": round(features["avgCompletionRate"], 3)
+                    },
+                    "churn_prediction": prediction,
+                    "churn_probability": round(float(probability), 3),
+                    "scored_at": now
+                }},
+                upsert=True
+            ))
+
+        score_collection.bulk_write(operations, ordered=False)
+        scored += len(usernames)
+        logger.info(f"Scored {scored} users so far")
+
+    elapsed = time.perf_counter() - started
+    result = {
+        "scored": scored,
+        "seconds": round(elapsed, 3),
+        "users_per_second": round(scored / elapsed, 1) if elapsed else 0.0
+    }
+
+    logger.info(f"Batch churn scoring finished : {result}")
+    return result
+
+
+# -------------------------------
+# Read a precomputed score
+# -------------------------------
+def get_stored_churn_score(username, max_age_hours=24):
+    return score_collection.find_one(
+        {
+            "username": username,
+            "scored_at": {"$gte": datetime.now() - timedelta(hours=max_age_hours)}
+        },
+        {"_id": 0}
+    )
+
+
+# -------------------------------
+# In-process scheduler
+# -------------------------------
+def _scheduler(interval_hours, chunk_size):
+    while True:
+        time.sleep(interval_hours * 60 * 60)
+        try:
+            run_batch_scoring(chunk_size)
+        except Exception:
+            logger.exception("Scheduled batch churn scoring failed")
+
+
+def start_churn_batch_scheduler(interval_hours, chunk_size=DEFAULT_CHUNK_SIZE):
+    global _scheduler_thread
+
+    if _scheduler_thread is not None:
+        return
+
+    _scheduler_thread = threading.Thread(
+        target=_scheduler,
+        args=(interval_hours, chunk_size),
+        name="churn-batch-scoring",
+        daemon=True
+    )
+    _scheduler_thread.start()
+    logger.info(f"Batch churn scoring scheduled every {interval_hours}h")
+
+
+# Usage: python -m services.churn_batch_service --chunk-size 1000
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score churn for every subscriber")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    run_batch_scoring(args.chunk_size)
@@ -0,0 +1,152 @@
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import numpy as np
+
+from logger import LoggerFactory
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+def _blocks_event_loop() -> bool:
+    """
+    True when running under eventlet without patched threads: waiting on
+    the worker would then block the hub, so no other request could ever
+    join the batch.
+    """
+    eventlet = sys.modules.get("eventlet")
+    return eventlet is not None and not eventlet.patcher.is_monkey_patched("thread")
+
+
+class ChurnInferenceQueue:
+    """
+    Collects concurrent single-row scoring requests and runs one
+    predict_proba over the whole batch. A batch is closed when it reaches
+    max_batch_rows or when max_wait_ms have passed since its first row.
+    Relies on eventlet.monkey_patch() (app.py) to make the worker and the
+    waits green; unpatched under eventlet, every row is scored inline.
+    """
+
+    def __init__(self, model, max_batch_rows=64, max_wait_ms=5, max_queue_depth=1024):
+        self.model = model
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue(maxsize=max_queue_depth)
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # metrics
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_size = 0
+        self.max_queue_depth_seen = 0
+        self.total_wait_seconds = 0.0
+        self.inline_fallbacks = 0
+        self.timeouts = 0
+        self.batch_failures = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._worker,
+                    name="churn-inference",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _score_inline(self, row) -> float:
+        self.inline_fallbacks += 1
+        return float(self.model.predict_proba(np.array([row], dtype=float))[0][1])
+
+    def score(self, row, timeout=2.0) -> float:
+        """
+        Returns the churn probability for one feature row. Falls back to
+        scoring the row inline when the queue is full, the worker falls
+        behind (timeout) or the batched predict_proba fails.
+        """
+        if _blocks_event_loop():
+            return self._score_inline(row)
+        self._ensure_started()
+
+        future = Future()
+        try:
+            self._queue.put_nowait((row, future, time.perf_counter()))
+        except queue.Full:
+            # Queue saturated: score inline rather than making the request wait
+            return self._score_inline(row)
+
+        self.max_queue_depth_seen = max(self.max_queue_depth_seen, self._queue.qsize())
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self.timeouts += 1
+            future.cancel()
+            logger.warning("Batched churn inference timed out, scoring inline")
+        except Exception:
+            self.batch_failures += 1
+            logger.warning("Batched churn inference failed, scoring inline")
+        return self._score_inline(row)
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect_batch()
+            # Callers that timed out have cancelled their future and scored inline
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            matrix = np.array([row for row, _, _ in batch], dtype=float)
+
+            try:
+                probabilities = self.model.predict_proba(matrix)[:, 1]
+            except Exception as e:
+                logger.exception("Batched churn inference failed")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            for (_, future, enqueued_at), probability in zip(batch, probabilities):
+                self.total_wait_seconds += finished - enqueued_at
+                future.set_result(float(probability))
+
+            self.batches += 1
+            self.rows += len(batch)
+            self.max_batch_size = max(self.max_batch_size, len(batch))
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth_seen": self.max_queue_depth_seen,
+            "queue_capacity": self._queue.maxsize,
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "avg_wait_ms": round(self.total_wait_seconds / self.rows * 1000, 3) if self.rows else 0.0,
+            "max_batch_rows": self.max_batch_rows,
+            "max_wait_ms": self.max_wait * 1000,
+            "inline_fallbacks": self.inline_fallbacks,
+            "timeouts": self.timeouts,
+            "batch_failures": self.batch_failures
+        }
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+from cache import TTLCache
+from config import Config
+from date_utils import date_expr, since_filter, format_datetime, LOGIN_FORMAT, CREATED_FORMAT
+from logger import LoggerFactory
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+# Per-user dashboard snapshots, invalidated by the routes that change them
+_dashboard_cache = TTLCache(
+    maxsize=Config.DASHBOARD_CACHE_SIZE,
+    ttl=Config.DASHBOARD_CACHE_TTL
+)
+
+
+def _dashboard_pipeline(username, three_months_ago):
+    """
+    One round trip: the subscription document, the user's heatmap/streak
+    and the top 3 most-completed titles of the last 90 days.
+    """
+    return [
+        {"$match": {"username": username}},
+        {"$limit": 1},
+        {
+            "$project": {
+                "_id": 0,
+                "score": 1,
+                "watched_movies": {
+                    "$slice": [
+                        {
+                            "$sortArray": {
+                                "input": {"$ifNull": ["$watched_movies", []]},
+                                "sortBy": {"created_at": -1}
+                            }
+                        },
+                        5
+                    ]
+                }
+            }
+        },
+        {
+            "$lookup": {
+                "from": "users",
+                "pipeline": [
+                    {"$match": {"username": username}},
+                    {"$project": {"_id": 0, "watched_data": 1, "max_streak": 1}}
+                ],
+                "as": "user"
+            }
+        },
+        {
+            "$lookup": {
+                "from": "user_watched_movies",
+                "pipeline": [
+                    {"$match": {"username": username, **since_filter("watched_at", three_months_ago)}},
+                    {"$addFields": {"watched_at_date": date_expr("$watched_at", LOGIN_FORMAT)}},
+                    {"$match": {"watched_at_date": {"$gte": three_months_ago}}},
+                    {"$sort": {"completion_rate": -1}},
+                    {"$limit": 3},
+                    {"$project": {"_id": 0, "explore": 1, "explore_id": 1}}
+                ],
+                "as": "top_explores"
+            }
+        }
+    ]
+
+
+def get_dashboard(username, subscriptions_collection):
+    """
+    Returns (payload, status) for /subscriptions, served from the
+    per-user snapshot when one is cached.
+    """
+    cached = _dashboard_cache.get(username)
+    if cached is not None:
+        return cached
+
+    three_months_ago = datetime.utcnow() - timedelta(days=90)
+    result = list(subscriptions_collection.aggregate(_dashboard_pipeline(username, three_months_ago)))
+
+    if not result:
+        response = ({"is_premium_member": False}, 201)
+        _dashboard_cache.set(username, response)
+        return response
+
+    doc = result[0]
+    user = doc["user"][0] if doc["user"] else {}
+
+    watched_movies = [
+        {**item, "created_at": format_datetime(item.get("created_at"), CREATED_FORMAT)}
+        for item in doc.get("watched_movies", [])
+    ]
+
+    payload = {
+        "is_premium_member": True,
+        "score": doc.get("score"),
+        "watched_movies": watched_movies,
+        "heatmap_data": user.get("watched_data", []),
+        "recommendation": doc["top_explores"] or None,
+        "max_streak": user.get("max_streak", 0)
+    }
+
+    logger.debug(f"Dashboard for {username} :\n{payload}")
+
+    response = (payload, 200)
+    _dashboard_cache.set(username, response)
+    return response
+
+
+def invalidate_dashboard(username):
+    _dashboard_cache.pop(username)
+
+
+def get_dashboard_cache_stats() -> dict:
+    return _dashboard_cache.stats()
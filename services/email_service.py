@@ -1,15 +1,296 @@
 import smtplib
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, UTC
 from email.mime.text import MIMEText
+from pymongo import ReturnDocument
 from logger import LoggerFactory
 from flask import current_app
 
 logger = LoggerFactory.get_logger(__name__)
 
+
+# -------------------------------
+# SMTP connection pool
+# Keeps a few authenticated connections alive and re-checks them with
+# NOOP before reuse, reconnecting when the server dropped them.
+# -------------------------------
+class SMTPConnectionPool:
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True, size=2, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        return server
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    server = self._idle.pop() if self._idle else None
+                if server is None:
+                    return self._connect()
+                try:
+                    if server.noop()[0] == 250:
+                        return server
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self._close(server)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, server):
+        with self._lock:
+            self._idle.append(server)
+        self._slots.release()
+
+    def discard(self, server):
+        self._close(server)
+        self._slots.release()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for server in idle:
+            self._close(server)
+
+    def _close(self, server):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def send(self, message):
+        server = self.acquire()
+        try:
+            server.send_message(message)
+        except Exception:
+            self.discard(server)
+            raise
+        self.release(server)
+
+
+# -------------------------------
+# Outbound mail queue
+# Messages are persisted in the "mail_outbox" collection before the
+# request returns; background workers claim and send them, retrying
+# with exponential backoff. Once a row is sent or dead-lettered its
+# body (the OTP) is removed and done_at is set, which the TTL index
+# on mail_outbox uses to drop it after the retention period.
+# -------------------------------
+class MailQueue:
+
+    LATENCY_SAMPLES = 1000
+    STALE_CLAIM = timedelta(minutes=5)
+
+    def __init__(self, outbox_collection, pool, sender, workers=2, max_attempts=5, backoff_seconds=2):
+        self.outbox = outbox_collection
+        self.pool = pool
+        self.sender = sender
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self._wakeup = threading.Event()
+        self._threads = []
+
+        # metrics
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self._latencies = deque(maxlen=self.LATENCY_SAMPLES)     # enqueue -> delivered
+        self._send_times = deque(maxlen=self.LATENCY_SAMPLES)    # SMTP send only
+
+    def enqueue(self, receiver_email, subject, html):
+        now = datetime.now()
+        self.outbox.insert_one({
+            "to": receiver_email,
+            "subject": subject,
+            "html": html,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now
+        })
+        self._wakeup.set()
+
+    def _build_message(self, doc):
+        message = MIMEText(doc["html"], "html")
+        message["Subject"] = doc["subject"]
+        message["From"] = self.sender
+        message["To"] = doc["to"]
+        return message
+
+    def _claim(self):
+        now = datetime.now()
+        return self.outbox.find_one_and_update(
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"$set": {"status": "sending", "locked_at": now}, "$inc": {"attempts": 1}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _release_stale_claims(self):
+        # Messages claimed by a worker that died mid-send go back to the queue
+        self.outbox.update_many(
+            {"status": "sending", "locked_at": {"$lt": datetime.now() - self.STALE_CLAIM}},
+            {"$set": {"status": "pending"}}
+        )
+
+    def _finish(self, doc, status, **fields):
+        self.outbox.update_one(
+            {"_id": doc["_id"]},
+            {
+                # UTC-aware: the TTL index compares done_at against UTC
+                "$set": {"status": status, "done_at": datetime.now(UTC), **fields},
+                "$unset": {"html": ""}
+            }
+        )
+
+    def _deliver(self, doc):
+        started = time.perf_counter()
+        try:
+            self.pool.send(self._build_message(doc))
+        except Exception as e:
+            if doc["attempts"] >= self.max_attempts:
+                logger.exception(f"Giving up on e-mail {doc['_id']} after {doc['attempts']} attempts")
+                self.failed += 1
+                self._finish(doc, "failed", last_error=str(e))
+                return
+
+            delay = self.backoff_seconds * 2 ** (doc["attempts"] - 1)
+            logger.warning(f"E-mail {doc['_id']} failed (attempt {doc['attempts']}), retrying in {delay}s : {e}")
+            self.retries += 1
+            self.outbox.update_one(
+                {"_id": doc["_id"]},
+                {"$set": {
+                    "status": "pending",
+                    "last_error": str(e),
+                    "next_attempt_at": datetime.now() + timedelta(seconds=delay)
+                }}
+            )
+            return
+
+        self._send_times.append(time.perf_counter() - started)
+        self._latencies.append((datetime.now() - doc["created_at"]).total_seconds())
+        self.sent += 1
+        self._finish(doc, "sent")
+        logger.info(f"Email sent Successfully")
+
+    def _worker(self):
+        while True:
+            try:
+                doc = self._claim()
+                if doc is None:
+                    self._wakeup.wait(timeout=1)
+                    self._wakeup.clear()
+                    continue
+                self._deliver(doc)
+            except Exception:
+                logger.exception("Mail worker error")
+                time.sleep(1)
+
+    def _janitor(self):
+        while True:
+            time.sleep(self.STALE_CLAIM.total_seconds())
+            try:
+                self._release_stale_claims()
+            except Exception:
+                logger.exception("Failed to release stale mail claims")
+
+    def start(self):
+        if self._threads:
+            return
+        self._release_stale_claims()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"mail-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        janitor = threading.Thread(target=self._janitor, name="mail-janitor", daemon=True)
+        janitor.start()
+        self._threads.append(janitor)
+
+    def stats(self) -> dict:
+        def summary(samples):
+            if not samples:
+                return {"avg_ms": 0.0, "p95_ms": 0.0}
+            ordered = sorted(samples)
+            return {
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1)
+            }
+
+        return {
+            "queue_depth": self.outbox.count_documents({"status": "pending"}),
+            "in_flight": self.outbox.count_documents({"status": "sending"}),
+            "dead_letters": self.outbox.count_documents({"status": "failed"}),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "delivery_latency": summary(self._latencies),
+            "smtp_send_time": summary(self._send_times)
+        }
+
+
+_mail_queue = None
+
+
+def create_smtp_pool(config, size=None):
+    return SMTPConnectionPool(
+        host=config["SMTP_HOST"],
+        port=config["SMTP_PORT"],
+        username=config["SENDER_EMAIL"],
+        password=config["APP_PASSWORD"],
+        use_tls=config["SMTP_USE_TLS"],
+        size=size or config["SMTP_POOL_SIZE"]
+    )
+
+
+def start_mail_queue(outbox_collection, config):
+    global _mail_queue
+
+    if _mail_queue is not None:
+        return _mail_queue
+
+    _mail_queue = MailQueue(
+        outbox_collection,
+        create_smtp_pool(config),
+        sender=config["SENDER_EMAIL"],
+        workers=config["MAIL_WORKERS"],
+        max_attempts=config["MAIL_MAX_ATTEMPTS"]
+    )
+    _mail_queue.start()
+    return _mail_queue
+
+
+def get_mail_queue_stats() -> dict:
+    return _mail_queue.stats() if _mail_queue else {"started": False}
+
+
 def send_otp_email(receiver_email:str, otp:str):
+    """
+    Queues the OTP e-mail for background delivery. Returns True once the
+    message is durably stored in the outbox (or, when no queue is running,
+    once it was sent directly).
+    """
     logger.info(f"Sending OTP through E-mail")
     
     SENDER_EMAIL = current_app.config["SENDER_EMAIL"]
-    APP_PASSWORD = current_app.config["APP_PASSWORD"]
 
     html = f"""
     <!DOCTYPE html>
@@ -63,20 +344,24 @@ def send_otp_email(receiver_email:str, otp:str):
     </html>
     """
 
-    msg = MIMEText(html, "html")
-    msg["Subject"] = "Verify Your Email with OTP – Premium Membership"
-    msg["From"] = SENDER_EMAIL
-    msg["To"] = receiver_email
+    subject = "Verify Your Email with OTP – Premium Membership"
 
     try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(SENDER_EMAIL, APP_PASSWORD)
-            server.send_message(msg)
+        if _mail_queue is not None:
+            _mail_queue.enqueue(receiver_email, subject, html)
+            logger.info(f"OTP E-mail queued")
+            return True
+
+        msg = MIMEText(html, "html")
+        msg["Subject"] = subject
+        msg["From"] = SENDER_EMAIL
+        msg["To"] = receiver_email
+        pool = create_smtp_pool(current_app.config, size=1)
+        pool.send(msg)
+        pool.close_all()
 
         logger.info(f"Email sent Successfully")
         return True
     except Exception as e:
         logger.exception(f"Exception occured while sending  OTP E-mail")
         return False
-
@@ -0,0 +1,238 @@
+import argparse
+from datetime import datetime
+from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from config import Config
+from logger import LoggerFactory
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+# -------------------------------
+# Declared indexes, per collection
+# -------------------------------
+INDEXES = {
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),
+        IndexModel([("taken_subscription", ASCENDING)], name="taken_subscription"),
+    ],
+    "login_history": [
+        IndexModel([("username", ASCENDING), ("month", DESCENDING)], name="username_month"),
+    ],
+    "subscriptions": [
+        IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),
+    ],
+    "user_otp": [
+        IndexModel([("email", ASCENDING), ("username", ASCENDING)], name="email_username"),
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=Config.OTP_TTL_SECONDS, name="created_at_ttl"),
+    ],
+    "mail_outbox": [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt"),
+        # Only sent / failed rows carry done_at; pending ones never expire
+        IndexModel(
+            [("done_at", ASCENDING)],
+            expireAfterSeconds=Config.MAIL_OUTBOX_RETENTION_SECONDS,
+            name="done_at_ttl"
+        ),
+    ],
+    "group_watch": [
+        IndexModel([("added_at", ASCENDING)], name="added_at"),
+        # /watch-together-list pages through users in username order
+        IndexModel([("username", ASCENDING), ("added_at", ASCENDING)], name="username_added_at"),
+        IndexModel(
+            [("username", ASCENDING), ("explore", ASCENDING), ("explore_id", ASCENDING)],
+            unique=True,
+            name="username_explore_unique"
+        ),
+    ],
+    "user_watched_movies": [
+        IndexModel([("username", ASCENDING), ("watched_at", ASCENDING)], name="username_watched_at"),
+        IndexModel(
+            [("username", ASCENDING), ("explore", ASCENDING), ("explore_id", ASCENDING)],
+            name="username_explore"
+        ),
+    ],
+    "watch_parties": [
+        IndexModel([("code", ASCENDING)], unique=True, name="code_unique"),
+        # Inactive / abandoned parties are removed once expires_at passes
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+    "quiz_bank": [
+        IndexModel([("hash", ASCENDING)], unique=True, name="hash_unique"),
+    ],
+    "churn_features": [
+        IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),
+    ],
+    "churn_scores": [
+        IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),
+        IndexModel([("churn_probability", DESCENDING)], name="churn_probability"),
+    ],
+}
+
+
+# -------------------------------
+# Representative route queries, checked by the coverage report
+# (route, collection, filter, sort)
+# -------------------------------
+def _route_queries():
+    now = datetime.now()
+    username = "__index_report__"
+    return [
+        ("/register, /login", "users", {"username": username}, None),
+        ("batch churn scoring", "users", {"taken_subscription": True}, None),
+        ("/subscriptions, /login, /watch-party", "subscriptions", {"username": username}, None),
+        ("/watched", "subscriptions", {
+            "username": username,
+            "watched_movies.explore": "movie",
+            "watched_movies.explore_id": 1
+        }, None),
+        ("/send-otp, /verify-otp", "user_otp", {"email": "a@b.co", "username": username}, None),
+        ("/watch-together", "group_watch", {"username": username, "explore": "movie", "explore_id": 1}, None),
+        ("/watch-together-list", "group_watch", {
+            "username": {"$ne": username, "$gt": ""},
+            "added_at": {"$gte": now}
+        }, [("username", 1), ("added_at", 1)]),
+        ("/subscriptions, churn features", "user_watched_movies", {"username": username, "watched_at": {"$gte": now}}, None),
+        ("/watch-party/<code>, end_party", "watch_parties", {"code": "XXXXXX"}, None),
+        ("/quiz", "quiz_bank", {"hash": "0"}, None),
+        ("churn features", "churn_features", {"username": username}, None),
+        ("churn scores", "churn_scores", {"churn_probability": {"$gte": 0.5}}, [("churn_probability", -1)]),
+    ]
+
+
+# -------------------------------
+# Duplicate keys on unique indexes
+# Values are compared case-insensitively ($toLower), so "Alice" / "alice"
+# pairs are reported next to the exact duplicates that block an index.
+# -------------------------------
+def find_duplicates(collection, keys, limit=20) -> list:
+    """
+    Returns up to limit key groups that occur more than once, largest
+    first, as {"variants": [distinct key values], "count": n}.
+    """
+    group_id = {key.replace(".", "_"): {"$toLower": f"${key}"} for key in keys}
+    groups = collection.aggregate([
+        {"$group": {
+            "_id": group_id,
+            "variants": {"$addToSet": {key.replace(".", "_"): f"${key}" for key in keys}},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": limit}
+    ], allowDiskUse=True)
+    return [{"variants": group["variants"], "count": group["count"]} for group in groups]
+
+
+def _unique_indexes():
+    for collection_name, models in INDEXES.items():
+        for model in models:
+            if model.document.get("unique"):
+                yield collection_name, model.document["name"], list(model.document["key"])
+
+
+def duplicate_report(db) -> dict:
+    """
+    Duplicate keys per declared unique index ("collection.index" -> groups);
+    indexes without duplicates are left out.
+    """
+    report = {}
+    for collection_name, name, keys in _unique_indexes():
+        duplicates = find_duplicates(db[collection_name], keys)
+        if duplicates:
+            logger.warning(f"Duplicate keys for unique index {collection_name}.{name} : {len(duplicates)} groups")
+            report[f"{collection_name}.{name}"] = duplicates
+    return report
+
+
+def ensure_indexes(db) -> dict:
+    """
+    Creates every declared index. Safe to run repeatedly: existing
+    indexes are left alone and a failing index does not stop the others.
+    Data is never changed here: a unique index blocked by existing
+    duplicates is reported with the duplicate keys (see migrations/ for
+    the clean-up scripts).
+    """
+    report = {}
+    for collection_name, models in INDEXES.items():
+        created, failed, duplicates = [], {}, {}
+        for model in models:
+            name = model.document["name"]
+            try:
+                db[collection_name].create_indexes([model])
+                created.append(name)
+            except OperationFailure as e:
+                logger.error(f"Could not create index {collection_name}.{name} : {e}")
+                failed[name] = str(e)
+                if model.document.get("unique"):
+                    duplicates[name] = find_duplicates(db[collection_name], list(model.document["key"]))
+                    logger.warning(
+                        f"Unique index {collection_name}.{name} missing, "
+                        f"{len(duplicates[name])} duplicate key groups found"
+                    )
+        report[collection_name] = {"ensured": created, "failed": failed, "duplicates": duplicates}
+
+    logger.info("Index bootstrap finished")
+    return report
+
+
+def _stages(plan):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def coverage_report(db) -> list:
+    """
+    Explains each representative route query and flags the ones whose
+    winning plan is a COLLSCAN.
+    """
+    report = []
+    for route, collection_name, query_filter, sort in _route_queries():
+        command = {"find": collection_name, "filter": query_filter}
+        if sort:
+            command["sort"] = dict(sort)
+
+        explain = db.command("explain", command, verbosity="queryPlanner")
+        stages = list(_stages(explain["queryPlanner"]["winningPlan"]))
+        collscan = "COLLSCAN" in stages
+
+        if collscan:
+            logger.warning(f"COLLSCAN : {route} on {collection_name} {query_filter}")
+
+        report.append({
+            "route": route,
+            "collection": collection_name,
+            "filter": str(query_filter),
+            "stages": stages,
+            "collscan": collscan
+        })
+
+    return report
+
+
+# Usage: python -m services.index_service [--report]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create declared MongoDB indexes")
+    parser.add_argument("--report", action="store_true", help="also print the index-coverage report")
+    args = parser.parse_args()
+
+    db = MongoClient(Config.MONGO_URI).get_default_database()
+    for collection_name, result in ensure_indexes(db).items():
+        for name, error in result["failed"].items():
+            print(f"FAILED    {collection_name}.{name} : {error}")
+            for group in result["duplicates"].get(name, []):
+                print(f"          {group['count']} x {group['variants']}")
+
+    if args.report:
+        for index, groups in duplicate_report(db).items():
+            for group in groups:
+                print(f"DUPLICATE {index:40} {group['count']} x {group['variants']}")
+        for row in coverage_report(db):
+            status = "COLLSCAN" if row["collscan"] else "ok"
+            print(f"{status:9} {row['collection']:20} {row['route']:40} {' > '.join(filter(None, row['stages']))}")
@@ -0,0 +1,108 @@
+import threading
+import time
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.output_parsers import StrOutputParser
+from flask import current_app
+from logger import LoggerFactory
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+# -------------------------------
+# Process-wide LLM client / chain registry
+# Each worker builds a client and an LCEL chain once and reuses them,
+# so the underlying HTTP connections stay pooled across requests.
+# -------------------------------
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+_lock = threading.RLock()
+_llms = {}          # (model, temperature) -> ChatGoogleGenerativeAI
+_prompts = {}       # chain name -> (prompt, model, temperature)
+_chains = {}        # chain name -> compiled chain
+_stats = {}         # chain name -> timing counters
+
+
+def get_llm(model: str = DEFAULT_MODEL, temperature: float = 0.3, api_key: str | None = None):
+    key = (model, temperature)
+    llm = _llms.get(key)
+    if llm is not None:
+        return llm
+
+    with _lock:
+        if key not in _llms:
+            _llms[key] = ChatGoogleGenerativeAI(
+                model=model,
+                temperature=temperature,
+                google_api_key=api_key or current_app.config["GOOGLE_API_KEY"]
+            )
+        return _llms[key]
+
+
+def register_chain(name: str, prompt, model: str = DEFAULT_MODEL, temperature: float = 0.3):
+    """
+    Registers a prompt under a chain name. The chain itself is compiled
+    lazily on first use because the API key lives in the app config.
+    """
+    _prompts[name] = (prompt, model, temperature)
+    _stats[name] = {
+        "build_seconds": 0.0,
+        "invocations": 0,
+        "invoke_seconds_total": 0.0
+    }
+
+
+def get_chain(name: str, api_key: str | None = None):
+    chain = _chains.get(name)
+    if chain is not None:
+        return chain
+
+    prompt, model, temperature = _prompts[name]
+    with _lock:
+        if name not in _chains:
+            started = time.perf_counter()
+            llm = get_llm(model, temperature, api_key)
+            _chains[name] = prompt | llm | StrOutputParser()
+            _stats[name]["build_seconds"] = round(time.perf_counter() - started, 6)
+            logger.info(f"Built LLM chain '{name}' in {_stats[name]['build_seconds']}s")
+        return _chains[name]
+
+
+def invoke_chain(name: str, inputs: dict, api_key: str | None = None) -> str:
+    chain = get_chain(name, api_key)
+
+    started = time.perf_counter()
+    try:
+        return chain.invoke(inputs)
+    finally:
+        stats = _stats[name]
+        stats["invocations"] += 1
+        stats["invoke_seconds_total"] += time.perf_counter() - started
+
+
+def stream_chain(name: str, inputs: dict, api_key: str | None = None):
+    """
+    Yields the chain output chunk by chunk as the model generates it.
+    """
+    chain = get_chain(name, api_key)
+
+    started = time.perf_counter()
+    try:
+        for chunk in chain.stream(inputs):
+            yield chunk
+    finally:
+        stats = _stats[name]
+        stats["invocations"] += 1
+        stats["invoke_seconds_total"] += time.perf_counter() - started
+
+
+def get_llm_stats() -> dict:
+    result = {}
+    for name, stats in _stats.items():
+        calls = stats["invocations"]
+        result[name] = {
+            "compiled": name in _chains,
+            "build_seconds": stats["build_seconds"],
+            "invocations": calls,
+            "avg_invoke_seconds": round(stats["invoke_seconds_total"] / calls, 4) if calls else 0.0
+        }
+    return result
@@ -0,0 +1,44 @@
+from config import Config
+from logger import LoggerFactory
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+# -------------------------------
+# Login history
+# Full history lives in "login_history", one bucket per user per month:
+#   {"_id": "alice:2026-10", "username": "alice", "month": "2026-10", "logins": [datetime, ...]}
+# The user document only keeps a capped "recent_logins" summary and
+# "last_login", which is all churn scoring needs.
+# -------------------------------
+def month_key(moment):
+    return moment.strftime("%Y-%m")
+
+
+def bucket_id(username, moment):
+    return f"{username}:{month_key(moment)}"
+
+
+def record_login_event(users_collection, login_history_collection, username, login_at):
+    users_collection.update_one(
+        {"username": username},
+        {
+            "$push": {
+                "recent_logins": {
+                    "$each": [login_at],
+                    "$slice": -Config.RECENT_LOGINS_CAP
+                }
+            },
+            "$max": {"last_login": login_at}
+        }
+    )
+
+    login_history_collection.update_one(
+        {"_id": bucket_id(username, login_at)},
+        {
+            "$push": {"logins": login_at},
+            "$setOnInsert": {"username": username, "month": month_key(login_at)}
+        },
+        upsert=True
+    )
@@ -0,0 +1,238 @@
+import threading
+import time
+from logger import LoggerFactory
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+# -------------------------------
+# Watch-party playback sync
+# The server holds the authoritative playback state per party code:
+#   position at updated_at (server epoch seconds) + playing flag.
+# Only the host can play / pause / seek. Clients estimate their clock
+# offset with sync_ping / sync_pong (NTP style, offset = server_time -
+# client_time - rtt / 2) and correct their player against the state
+# carried by playback_state and the periodic sync_tick events.
+# -------------------------------
+ACTIONS = ("play", "pause", "seek")
+
+
+def server_time() -> float:
+    return round(time.time(), 3)
+
+
+class PlaybackState:
+    __slots__ = ("code", "host", "playing", "position", "updated_at", "seq")
+
+    def __init__(self, code, host, playing=False, position=0.0, updated_at=None, seq=0):
+        self.code = code
+        self.host = host
+        self.playing = playing
+        self.position = position
+        self.updated_at = updated_at if updated_at is not None else server_time()
+        self.seq = seq
+
+    def position_at(self, now: float) -> float:
+        if self.playing:
+            return self.position + (now - self.updated_at)
+        return self.position
+
+    def snapshot(self) -> dict:
+        now = server_time()
+        return {
+            "code": self.code,
+            "playing": self.playing,
+            "position": round(self.position_at(now), 3),
+            "server_time": now,
+            "seq": self.seq
+        }
+
+    def to_doc(self) -> dict:
+        return {
+            "playing": self.playing,
+            "position": self.position,
+            "updated_at": self.updated_at,
+            "seq": self.seq
+        }
+
+
+class PlaybackSync:
+    """
+    Playback states are persisted on the watch_parties document so a late
+    joiner served by any worker gets a snapshot. The worker that handled
+    the host's last action keeps the state in memory and sends the sync
+    ticks; it drops the room as soon as another worker has persisted a
+    newer action.
+    """
+
+    # Re-reads allowed when another worker persisted a newer action first
+    CONTROL_ATTEMPTS = 3
+
+    def __init__(self, watch_parties_collection, socketio, presence, tick_interval=5):
+        self.collection = watch_parties_collection
+        self.socketio = socketio
+        self.presence = presence
+        self.tick_interval = tick_interval
+        self._states = {}       # code -> PlaybackState owned (ticked) by this worker
+        self._lock = threading.Lock()
+        self._task = None
+        self.ticks_sent = 0
+        self.conflicts = 0
+        self.actions = {action: 0 for action in ACTIONS}
+
+    def _load(self, code):
+        state = self._states.get(code)
+        if state is not None:
+            return state
+        return self._read(code)
+
+    def _read(self, code):
+        party = self.collection.find_one(
+            {"code": code, "active": True},
+            {"_id": 0, "host": 1, "playback": 1}
+        )
+        if not party:
+            return None
+
+        playback = party.get("playback") or {}
+        return PlaybackState(
+            code,
+            party["host"],
+            playing=playback.get("playing", False),
+            position=playback.get("position", 0.0),
+            updated_at=playback.get("updated_at"),
+            seq=playback.get("seq", 0)
+        )
+
+    def get_state(self, code):
+        """
+        Snapshot for a late joiner, or None if the code is not an active party.
+        """
+        state = self._load(code)
+        return state.snapshot() if state else None
+
+    def control(self, code, username, action, position=None):
+        """
+        Applies a host action. Returns (snapshot, error message).
+
+        The write only lands if the persisted seq is still older than the
+        new one; otherwise another worker has handled a newer action, so
+        the cached state is dropped and the action re-applied on the
+        state read back from Mongo.
+        """
+        if action not in ACTIONS:
+            return None, "Unknown playback action"
+        if action == "seek" and position is None:
+            return None, "position is required"
+        if position is not None:
+            try:
+                position = max(0.0, float(position))
+            except (TypeError, ValueError):
+                return None, "position must be a number"
+
+        for _ in range(self.CONTROL_ATTEMPTS):
+            state = self._load(code)
+            if state is None:
+                return None, "Watch party not found"
+            if state.host != username:
+                return None, "Only the host can control playback"
+
+            now = server_time()
+            playing = state.playing
+            if action == "play":
+                playing = True
+            elif action == "pause":
+                playing = False
+            updated = PlaybackState(
+                code,
+                state.host,
+                playing=playing,
+                position=state.position_at(now) if position is None else position,
+                updated_at=now,
+                seq=state.seq + 1
+            )
+
+            try:
+                result = self.collection.update_one(
+                    {"code": code, "active": True, "playback.seq": {"$not": {"$gte": updated.seq}}},
+                    {"$set": {"playback": updated.to_doc()}}
+                )
+            except Exception:
+                # The in-memory state stays authoritative for this worker
+                logger.exception(f"Failed to persist playback state for {code}")
+            else:
+                if result.matched_count == 0:
+                    # Newer action persisted elsewhere (or the party ended): reload
+                    self.end(code)
+                    self.conflicts += 1
+                    continue
+
+            with self._lock:
+                self._states[code] = updated
+                self.actions[action] += 1
+            return updated.snapshot(), None
+
+        return None, "Playback state is changing, try again"
+
+    def end(self, code):
+        with self._lock:
+            self._states.pop(code, None)
+
+    def _tick(self):
+        with self._lock:
+            states = list(self._states.values())
+
+        # Paused rooms need no ticks, but are dropped once everyone has left
+        for state in states:
+            if not state.playing and not self.presence.room_size(state.code):
+                self.end(state.code)
+
+        states = [state for state in states if state.playing]
+        if not states:
+            return
+
+        # One query per tick: hand rooms over when another worker has a newer action
+        persisted = {
+            doc["code"]: doc.get("playback", {}).get("seq", 0)
+            for doc in self.collection.find(
+                {"code": {"$in": [state.code for state in states]}, "active": True},
+                {"_id": 0, "code": 1, "playback.seq": 1}
+            )
+        }
+
+        for state in states:
+            code = state.code
+            seq = persisted.get(code)
+            if seq is None or seq > state.seq or not self.presence.room_size(code):
+                # Ended, taken over, or nobody left to sync
+                self.end(code)
+                continue
+            snapshot = state.snapshot()
+            self.socketio.emit("sync_tick", {
+                "code": code,
+                "position": snapshot["position"],
+                "server_time": snapshot["server_time"],
+                "seq": snapshot["seq"]
+            }, to=code)
+            self.ticks_sent += 1
+
+    def _worker(self):
+        while True:
+            self.socketio.sleep(self.tick_interval)
+            try:
+                self._tick()
+            except Exception:
+                logger.exception("Playback sync tick failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = self.socketio.start_background_task(self._worker)
+
+    def stats(self) -> dict:
+        return {
+            "tick_interval": self.tick_interval,
+            "owned_rooms": len(self._states),
+            "ticks_sent": self.ticks_sent,
+            "conflicts": self.conflicts,
+            "actions": dict(self.actions)
+        }
@@ -1,10 +1,12 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 from datetime import datetime, timedelta
 import joblib
-import numpy as np
 import os
 
 from logger import LoggerFactory
+from config import Config
+from date_utils import to_datetime, since_filter
+from services.churn_inference_service import ChurnInferenceQueue
 
 
 logger = LoggerFactory.get_logger(__name__)
@@ -15,99 +17,259 @@ logger = LoggerFactory.get_logger(__name__)
 # -------------------------------
 model = joblib.load(os.path.join("model", "xgb_churn_model.pkl"))
 
+# Concurrent logins share one predict_proba call per micro-batch
+inference_queue = ChurnInferenceQueue(
+    model,
+    max_batch_rows=Config.CHURN_INFERENCE_MAX_BATCH_ROWS,
+    max_wait_ms=Config.CHURN_INFERENCE_MAX_WAIT_MS,
+    max_queue_depth=Config.CHURN_INFERENCE_MAX_QUEUE_DEPTH
+)
+
 # -------------------------------
 # MongoDB Connection
 # -------------------------------
-client = MongoClient("mongodb://localhost:27017/")
-db = client["movie_app_db"]
+# Same database the app writes to (and index_service builds indexes on)
+client = MongoClient(Config.MONGO_URI)
+db = client.get_default_database("movie_app_db")
 
 watch_collection = db["user_watched_movies"]
 login_collection = db["users"]
+feature_collection = db["churn_features"]
+
+# Features look back over this many days
+FEATURE_WINDOW_DAYS = 5
+
+# Probability above which a user is labelled as churning
+# (same cut-off XGBClassifier.predict applies for binary models)
+PREDICTION_THRESHOLD = 0.5
 
 # -------------------------------
-# Helper: Convert String to Datetime
+# Helper: Day bucket key ("20261018")
 # -------------------------------
-def parse_date(date_string):
-    return datetime.strptime(date_string, "%d-%m-%Y %H:%M:%S")
+def day_key(moment):
+    return moment.strftime("%Y%m%d")
 
 
 # -------------------------------
-# Predict Churn Function
+# Feature Store
+# One document per user in "churn_features", updated as events happen:
+#   {
+#     "username": ...,
+#     "last_login": datetime,
+#     "seeded": True once backfilled from raw history,
+#     "days": {
+#         "20261018": {"logins": 2, "titles": ["movie_278"],
+#                      "completion_sum": 1.4, "completion_count": 2}
+#     }
+#   }
+# Every write is a pipeline update that also drops day buckets older
+# than the feature window, so users who are never scored (and never
+# read) keep at most FEATURE_WINDOW_DAYS + 1 buckets.
 # -------------------------------
-def predict_churn(username, login_doc, watch_docs):
+def _prune_days_stage(moment):
+    cutoff_day = day_key(moment - timedelta(days=FEATURE_WINDOW_DAYS))
+    return {"$set": {"days": {"$arrayToObject": {"$filter": {
+        "input": {"$objectToArray": {"$ifNull": ["$days", {}]}},
+        "cond": {"$gte": ["$$this.k", cutoff_day]}
+    }}}}}
 
-    logger.info("churn prediction started")
 
-    logger.info(f"User : {username}")
-    now = datetime.now()
-    five_days_ago = now - timedelta(days=5)
+def _increment(path, amount):
+    return {"$add": [{"$ifNull": [f"${path}", 0]}, amount]}
 
-    # ---------------------------------
-    # LOGIN Data
-    # ---------------------------------
-    login_doc = login_collection.find_one({"username": username})
 
-    if not login_doc or "login_data" not in login_doc:
-        logger.info("No login data found")
+def record_login(username, login_at=None):
+    login_at = login_at or datetime.now()
+    day = day_key(login_at)
+    feature_collection.update_one(
+        {"username": username},
+        [
+            _prune_days_stage(login_at),
+            {"$set": {
+                "last_login": {"$max": ["$last_login", login_at]},
+                f"days.{day}.logins": _increment(f"days.{day}.logins", 1)
+            }}
+        ],
+        upsert=True
+    )
 
-    login_dates = [parse_date(d) for d in login_doc["login_data"]]
-    login_dates.sort()
 
-    # Days since last login
-    last_login = login_dates[-1]
-    days_since_last_login = (now - last_login).days
+def _watch_progress_update(explore, explore_id, completion_rate, watched_at):
+    day = day_key(watched_at)
+    return [
+        _prune_days_stage(watched_at),
+        {"$set": {
+            f"days.{day}.titles": {"$setUnion": [
+                {"$ifNull": [f"$days.{day}.titles", []]},
+                # Client-supplied: a leading "$" must stay data, not a field path
+                [{"$literal": f"{explore}_{explore_id}"}]
+            ]},
+            f"days.{day}.completion_sum": _increment(f"days.{day}.completion_sum", float(completion_rate or 0)),
+            f"days.{day}.completion_count": _increment(f"days.{day}.completion_count", 1)
+        }}
+    ]
 
-    # Login count last 5 days
-    login_count_last5d = sum(1 for d in login_dates if d >= five_days_ago)
 
-    # ---------------------------------
-    # 2️⃣ WATCH FEATURES
-    # ---------------------------------
-    watch_docs = list(watch_collection.find({"username": username}))
+def record_watch_progress_batch(entries):
+    """
+    Applies a flushed batch of coalesced watch-progress entries
+    (one per user and title) in a single bulk write.
+    """
+    operations = [
+        UpdateOne(
+            {"username": e["username"]},
+            _watch_progress_update(e["explore"], e["explore_id"], e["completion_rate"], e["watched_at"]),
+            upsert=True
+        )
+        for e in entries
+    ]
+    if operations:
+        feature_collection.bulk_write(operations, ordered=False)
 
-    recent_watches = []
+
+def rebuild_features(username, now=None):
+    """
+    Backfills the feature document from the raw login and watch history.
+    Used the first time a user is scored after the feature store exists.
+    """
+    now = now or datetime.now()
+    window_start = (now - timedelta(days=FEATURE_WINDOW_DAYS)).replace(hour=0, minute=0, second=0, microsecond=0)
+    cutoff_day = day_key(window_start)
+
+    # recent_logins is the capped summary; login_data is only left on users
+    # not yet moved to login_history buckets
+    login_doc = login_collection.find_one({"username": username}, {"recent_logins": 1, "login_data": 1}) or {}
+    login_dates = [
+        to_datetime(d)
+        for d in login_doc.get("recent_logins", []) + login_doc.get("login_data", [])
+    ]
+
+    days = {}
+    for login_at in login_dates:
+        day = day_key(login_at)
+        if day >= cutoff_day:
+            bucket = days.setdefault(day, {"logins": 0, "titles": [], "completion_sum": 0.0, "completion_count": 0})
+            bucket["logins"] += 1
+
+    watch_docs = watch_collection.find(
+        {"username": username, **since_filter("watched_at", window_start)},
+        {"explore": 1, "explore_id": 1, "completion_rate": 1, "watched_at": 1}
+    )
     for doc in watch_docs:
-        watched_at = parse_date(doc["watched_at"])
-        if watched_at >= five_days_ago:
-            recent_watches.append(doc)
+        day = day_key(to_datetime(doc["watched_at"]))
+        if day < cutoff_day:
+            continue
+        bucket = days.setdefault(day, {"logins": 0, "titles": [], "completion_sum": 0.0, "completion_count": 0})
+        title = f"{doc['explore']}_{doc['explore_id']}"
+        if title not in bucket["titles"]:
+            bucket["titles"].append(title)
+        bucket["completion_sum"] += float(doc.get("completion_rate") or 0)
+        bucket["completion_count"] += 1
+
+    features_doc = {
+        "username": username,
+        "last_login": max(login_dates) if login_dates else None,
+        "seeded": True,
+        "days": days
+    }
+    feature_collection.replace_one({"username": username}, features_doc, upsert=True)
+    return features_doc
 
-    # Unique movies watched
-    unique_movies = set()
-    for doc in recent_watches:
-        unique_id = f"{doc['explore']}_{doc['explore_id']}"
-        unique_movies.add(unique_id)
 
-    movies_watched_last5d = len(unique_movies)
+def build_features(features_doc, now=None):
+    """
+    Turns a feature document into the model's feature dict and returns
+    it together with the day buckets that fell out of the window.
+    """
+    now = now or datetime.now()
+    cutoff_day = day_key(now - timedelta(days=FEATURE_WINDOW_DAYS))
 
-    # Average completion rate
-    if recent_watches:
-        avg_completion_rate = sum(doc["completion_rate"] for doc in recent_watches) / len(recent_watches)
+    last_login = features_doc.get("last_login")
+    if last_login is None:
+        logger.info("No login data found")
+        days_since_last_login = 0
     else:
-        avg_completion_rate = 0
+        days_since_last_login = (now - last_login).days
+
+    login_count = 0
+    titles = set()
+    completion_sum = 0.0
+    completion_count = 0
+    stale_days = []
+
+    for day, bucket in (features_doc.get("days") or {}).items():
+        if day < cutoff_day:
+            stale_days.append(day)
+            continue
+        login_count += bucket.get("logins", 0)
+        titles.update(bucket.get("titles", []))
+        completion_sum += bucket.get("completion_sum", 0.0)
+        completion_count += bucket.get("completion_count", 0)
+
+    features = {
+        "daysSinceLastLogin": days_since_last_login,
+        "loginCountLast5d": login_count,
+        "moviesWatchedLast5d": len(titles),
+        "avgCompletionRate": completion_sum / completion_count if completion_count else 0
+    }
+    return features, stale_days
+
+
+def get_features(username, now=None):
+    now = now or datetime.now()
+
+    features_doc = feature_collection.find_one({"username": username})
+    if not features_doc or not features_doc.get("seeded"):
+        features_doc = rebuild_features(username, now)
+
+    features, stale_days = build_features(features_doc, now)
+
+    if stale_days:
+        feature_collection.update_one(
+            {"username": username},
+            {"$unset": {f"days.{day}": "" for day in stale_days}}
+        )
+
+    return features
+
+
+# -------------------------------
+# Helper: Feature dict -> model input row
+# -------------------------------
+def features_to_row(features):
+    return [
+        features["daysSinceLastLogin"],
+        features["loginCountLast5d"],
+        features["moviesWatchedLast5d"],
+        features["avgCompletionRate"]
+    ]
+
+
+# -------------------------------
+# Predict Churn Function
+# -------------------------------
+def predict_churn(username):
+
+    logger.info("churn prediction started")
+
+    logger.info(f"User : {username}")
 
     # ---------------------------------
-    # 3️⃣ Prepare Model Input
+    # 1️⃣ FEATURES (single point read)
     # ---------------------------------
-    features = np.array([[
-        days_since_last_login,
-        login_count_last5d,
-        movies_watched_last5d,
-        avg_completion_rate
-    ]])
+    features = get_features(username)
 
     # ---------------------------------
-    # 4️⃣ Prediction
+    # 2️⃣ Prediction (micro-batched)
     # ---------------------------------
-    prediction = model.predict(features)[0]
-    probability = model.predict_proba(features)[0][1]
+    probability = inference_queue.score(features_to_row(features))
+    prediction = int(probability > PREDICTION_THRESHOLD)
 
     result = {
         "username": username,
         "features": {
-            "daysSinceLastLogin": days_since_last_login,
-            "loginCountLast5d": login_count_last5d,
-            "moviesWatchedLast5d": movies_watched_last5d,
-            "avgCompletionRate": round(avg_completion_rate, 3)
+            **features,
+            "avgCompletionRate": round(features["avgCompletionRate"], 3)
         },
         "churn_prediction": int(prediction),
         "churn_probability": round(float(probability), 3),
@@ -0,0 +1,226 @@
+import threading
+from logger import LoggerFactory
+from services.watch_party_service import is_party_code
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+# -------------------------------
+# Socket.IO presence store
+# Two indexes kept in step:
+#   room -> {sid: username}   (roster, O(1) member count)
+#   sid  -> {room: username}  (every room a socket is in, for leave/disconnect)
+# Broadcasts themselves fan out through the Socket.IO message queue;
+# this store only has to be visible to every worker so that leave /
+# disconnect can be handled by whichever process owns the socket.
+# -------------------------------
+class InMemoryPresence:
+    """
+    Single-process presence store (the default when no message queue
+    is configured).
+    """
+
+    def __init__(self):
+        self._sids = {}     # sid -> {room: username}
+        self._rooms = {}    # room -> {sid: username}
+        self._lock = threading.Lock()
+
+    def join(self, sid, room, username):
+        with self._lock:
+            self._sids.setdefault(sid, {})[room] = username
+            self._rooms.setdefault(room, {})[sid] = username
+
+    def leave(self, sid, room=None):
+        """
+        Removes the sid from one room, or from every room when room is
+        None. Returns {room: username} for the rooms actually left.
+        """
+        with self._lock:
+            rooms = self._sids.get(sid)
+            if not rooms:
+                return {}
+
+            if room is None:
+                left = self._sids.pop(sid)
+            elif room in rooms:
+                left = {room: rooms.pop(room)}
+                if not rooms:
+                    del self._sids[sid]
+            else:
+                return {}
+
+            for left_room in left:
+                self._discard(sid, left_room)
+            return left
+
+    def get(self, sid):
+        return dict(self._sids.get(sid, {}))
+
+    def members(self, room):
+        return dict(self._rooms.get(room, {}))
+
+    def room_size(self, room):
+        return len(self._rooms.get(room, ()))
+
+    def rooms(self):
+        return list(self._rooms)
+
+    def close_room(self, room):
+        """
+        Drops a room from both indexes; returns the sids that were in it.
+        """
+        with self._lock:
+            roster = self._rooms.pop(room, {})
+            for sid in roster:
+                rooms = self._sids.get(sid)
+                if rooms is not None:
+                    rooms.pop(room, None)
+                    if not rooms:
+                        del self._sids[sid]
+            return list(roster)
+
+    def _discard(self, sid, room):
+        roster = self._rooms.get(room)
+        if roster is not None:
+            roster.pop(sid, None)
+            if not roster:
+                del self._rooms[room]
+
+
+class RedisPresence:
+    """
+    Presence shared by every worker through Redis.
+    sid:<sid>   hash {room: username}, expires so crashed workers do not leak sockets
+    room:<room> hash {sid: username} (Redis drops a hash once it is empty)
+    """
+
+    KEY_PREFIX = "presence"
+    SID_TTL_SECONDS = 24 * 60 * 60
+
+    def __init__(self, url=None, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.redis = client
+
+    def _sid_key(self, sid):
+        return f"{self.KEY_PREFIX}:sid:{sid}"
+
+    def _room_key(self, room):
+        return f"{self.KEY_PREFIX}:room:{room}"
+
+    def join(self, sid, room, username):
+        pipe = self.redis.pipeline()
+        pipe.hset(self._sid_key(sid), room, username)
+        pipe.expire(self._sid_key(sid), self.SID_TTL_SECONDS)
+        pipe.hset(self._room_key(room), sid, username)
+        pipe.execute()
+
+    def leave(self, sid, room=None):
+        rooms = self.get(sid)
+        if room is not None:
+            rooms = {room: rooms[room]} if room in rooms else {}
+        if not rooms:
+            return {}
+
+        pipe = self.redis.pipeline()
+        pipe.hdel(self._sid_key(sid), *rooms)
+        for left_room in rooms:
+            pipe.hdel(self._room_key(left_room), sid)
+        pipe.execute()
+        return rooms
+
+    def get(self, sid):
+        return self.redis.hgetall(self._sid_key(sid))
+
+    def members(self, room):
+        return self.redis.hgetall(self._room_key(room))
+
+    def room_size(self, room):
+        return self.redis.hlen(self._room_key(room))
+
+    def rooms(self):
+        prefix = self._room_key("")
+        return [key[len(prefix):] for key in self.redis.scan_iter(match=f"{prefix}*")]
+
+    def close_room(self, room):
+        sids = list(self.members(room))
+        pipe = self.redis.pipeline()
+        pipe.delete(self._room_key(room))
+        for sid in sids:
+            pipe.hdel(self._sid_key(sid), room)
+        pipe.execute()
+        return sids
+
+    def cleanup(self):
+        """
+        Drops roster entries whose sid hash has expired (socket owned by a
+        worker that died without handling disconnect). Returns the number
+        of rooms that ended up empty.
+        """
+        removed = 0
+        for room in self.rooms():
+            sids = list(self.members(room))
+            pipe = self.redis.pipeline()
+            for sid in sids:
+                pipe.hexists(self._sid_key(sid), room)
+            stale = [sid for sid, alive in zip(sids, pipe.execute()) if not alive]
+            if stale:
+                self.redis.hdel(self._room_key(room), *stale)
+                if len(stale) == len(sids):
+                    removed += 1
+        return removed
+
+
+def create_presence_backend(message_queue=None):
+    """
+    Redis-backed presence when a Socket.IO message queue is configured
+    (multi-worker deployments), otherwise the in-memory store.
+    """
+    if message_queue:
+        logger.info("Using Redis presence backend")
+        return RedisPresence(url=message_queue)
+    return InMemoryPresence()
+
+
+def sweep_presence(presence, watch_parties_collection, socketio):
+    """
+    One cleanup pass. Closes every watch-party room whose party is no
+    longer active, whether it was ended (active: False) or its document
+    has already been removed by the TTL index; other rooms (movie-*) are
+    left alone. With Redis, also drops roster entries of sockets whose
+    worker died. Returns (closed rooms, rooms emptied of stale sids).
+    """
+    party_rooms = [room for room in presence.rooms() if is_party_code(room)]
+    active = {
+        doc["code"] for doc in watch_parties_collection.find(
+            {"code": {"$in": party_rooms}, "active": True}, {"_id": 0, "code": 1}
+        )
+    } if party_rooms else set()
+
+    ended = [room for room in party_rooms if room not in active]
+    for room in ended:
+        presence.close_room(room)
+        socketio.close_room(room)
+
+    # The in-memory store drops empty rosters as sids leave; only Redis can hold stale sids
+    removed = presence.cleanup() if isinstance(presence, RedisPresence) else 0
+    return ended, removed
+
+
+def start_presence_cleanup(presence, watch_parties_collection, socketio, interval=300):
+    """
+    Periodically runs sweep_presence, so presence stays bounded over
+    long uptimes.
+    """
+    def worker():
+        while True:
+            socketio.sleep(interval)
+            try:
+                ended, removed = sweep_presence(presence, watch_parties_collection, socketio)
+                if ended or removed:
+                    logger.info(f"Presence cleanup: closed {len(ended)} ended rooms, removed {removed} empty rooms")
+            except Exception:
+                logger.exception("Presence cleanup failed")
+
+    return socketio.start_background_task(worker)
@@ -1,35 +1,22 @@
 import os
 import json
 import re
-from langchain_google_genai import ChatGoogleGenerativeAI
+import hashlib
+import threading
+from datetime import datetime, UTC
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from flask import current_app, jsonify
+from flask import jsonify
+from pymongo import UpdateOne
 from logger import LoggerFactory
+from config import Config
+from services.llm_service import register_chain, invoke_chain
 
 
 logger = LoggerFactory.get_logger(__name__)
 
 
-def extract_json(raw: str) -> dict:
-    match = re.search(r"```(?:json)?\s*([\s\S]*?)```", raw)
-    if not match:
-        raise ValueError("No JSON block found in LLM response")
-    return json.loads(match.group(1))
-
-def generate_quiz_questions(username:str):
-
-    logger.info(f"Generating Quiz questions...!!!")
-    
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        temperature=0.3,
-        google_api_key=current_app.config["GOOGLE_API_KEY"]
-    )
-
-
-    prompt = PromptTemplate(
-        template="""
+QUIZ_PROMPT = PromptTemplate(
+    template="""
         You are a quiz generator.
 
         Generate exactly 5 quiz questions related to Hollywood and Bollywood movies.
@@ -56,26 +43,141 @@ def generate_quiz_questions(username:str):
             ]
         }}
     """
+)
+
+register_chain("quiz", QUIZ_PROMPT, temperature=0.3)
+# Bank refills favour variety so that deduplication keeps finding new questions
+register_chain("quiz_bank", QUIZ_PROMPT, temperature=0.9)
+
+QUIZ_SIZE = 5
+
+# Refill worker gives up for this round after this many batches with nothing new
+MAX_STALE_BATCHES = 3
+
+_refill_event = threading.Event()
+_refill_thread = None
+
+
+def extract_json(raw: str) -> dict:
+    match = re.search(r"```(?:json)?\s*([\s\S]*?)```", raw)
+    if not match:
+        raise ValueError("No JSON block found in LLM response")
+    return json.loads(match.group(1))
+
+
+def question_hash(question: dict) -> str:
+    """
+    Content hash of a question, insensitive to case and whitespace,
+    used to deduplicate the question bank.
+    """
+    text = " ".join(question["question"].lower().split())
+    options = "|".join(
+        " ".join(str(question["options"][key]).lower().split())
+        for key in sorted(question["options"])
+    )
+    return hashlib.sha256(f"{text}#{options}".encode("utf-8")).hexdigest()
+
+
+def store_questions(bank_collection, questions: list) -> int:
+    """
+    Upserts questions into the bank keyed by content hash.
+    Returns how many of them were new.
+    """
+    now = datetime.now(UTC)
+    operations = []
+    for q in questions:
+        content_hash = question_hash(q)
+        operations.append(UpdateOne(
+            {"hash": content_hash},
+            {"$setOnInsert": {
+                "hash": content_hash,
+                "question": q["question"],
+                "options": q["options"],
+                "correct_answer": q["correct_answer"],
+                "created_at": now
+            }},
+            upsert=True
+        ))
+
+    if not operations:
+        return 0
+
+    result = bank_collection.bulk_write(operations, ordered=False)
+    return result.upserted_count
+
+
+def _sample_questions(bank_collection, size: int = QUIZ_SIZE) -> list:
+    return list(bank_collection.aggregate([
+        {"$sample": {"size": size}},
+        {"$project": {"_id": 0, "question": 1, "options": 1, "correct_answer": 1}}
+    ]))
+
+
+def request_quiz_bank_refill():
+    _refill_event.set()
+
+
+def _refill_bank(bank_collection, api_key: str):
+    count = bank_collection.estimated_document_count()
+    if count >= Config.QUIZ_BANK_LOW_WATERMARK:
+        return
+
+    logger.info(f"Quiz bank below watermark ({count}), refilling...!!!")
+    stale_batches = 0
+    while count < Config.QUIZ_BANK_TARGET_SIZE and stale_batches < MAX_STALE_BATCHES:
+        result = invoke_chain("quiz_bank", {}, api_key=api_key)
+        added = store_questions(bank_collection, extract_json(result)["quiz"])
+        stale_batches = 0 if added else stale_batches + 1
+        count += added
+
+    logger.info(f"Quiz bank refilled to {count} questions")
+
+
+def _refill_worker(bank_collection, api_key: str):
+    while True:
+        _refill_event.wait(timeout=Config.QUIZ_BANK_REFILL_INTERVAL)
+        _refill_event.clear()
+        try:
+            _refill_bank(bank_collection, api_key)
+        except Exception:
+            logger.exception("Quiz bank refill failed")
+
+
+def start_quiz_bank_refill(bank_collection, api_key: str):
+    global _refill_thread
+
+    if _refill_thread is not None:
+        return
+
+    _refill_thread = threading.Thread(
+        target=_refill_worker,
+        args=(bank_collection, api_key),
+        name="quiz-bank-refill",
+        daemon=True
     )
+    _refill_thread.start()
+    request_quiz_bank_refill()
 
-    parser = StrOutputParser()
 
-    chain = prompt | llm | parser
+def generate_quiz_questions(username:str, bank_collection):
 
+    logger.info(f"Serving Quiz questions from bank...!!!")
+    
     try:
-        logger.info(f"In try block...!!!")
-        result = chain.invoke({})
+        quiz = _sample_questions(bank_collection)
+
+        if len(quiz) < QUIZ_SIZE:
+            # Cold bank: generate synchronously once and keep the questions
+            logger.info(f"Quiz bank too small, generating questions...!!!")
+            result = invoke_chain("quiz", {})
+            quiz = extract_json(result)["quiz"]
+            store_questions(bank_collection, quiz)
 
-        # logger.info(f"result type : {type(result)}")
-        # logger.info(f"Raw Response :\n{result}")
-        
-        data = extract_json(result)
-        # logger.info(f"Type of data : {type(data)}")
-        # logger.info(f"Data :\n{data}")
+        request_quiz_bank_refill()
 
         return jsonify({
             "username":username,
-            "quiz":data["quiz"]
+            "quiz":quiz
         }), 201
 
     except Exception as e:
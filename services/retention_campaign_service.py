@@ -0,0 +1,287 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+from email.mime.text import MIMEText
+
+from config import Config
+from logger import LoggerFactory
+from services.email_service import create_smtp_pool
+from services.predict_churn_service import db, login_collection, PREDICTION_THRESHOLD
+from services.churn_batch_service import score_collection, score_chunk
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+checkpoint_collection = db["campaign_checkpoints"]
+
+CHUNK_SIZE = 500
+CHECKPOINT_EVERY = 100
+
+
+# -------------------------------
+# Templates, rendered once per variant
+# -------------------------------
+RETENTION_TEMPLATES = {
+    "high_risk": {
+        "subject": "We miss you – here's what's new on Premium",
+        "headline": "It's been a while!",
+        "body": "Your Premium membership is waiting for you. New releases, fresh "
+                "recommendations and your watch streak are just one click away."
+    },
+    "at_risk": {
+        "subject": "Your next favourite movie is waiting",
+        "headline": "Picked just for you",
+        "body": "We've lined up new recommendations based on what you love. "
+                "Jump back in and keep your streak going."
+    }
+}
+
+
+def render_variant(variant):
+    template = RETENTION_TEMPLATES[variant]
+    html = f"""
+    <!DOCTYPE html>
+    <html>
+    <body style="font-family: Arial, Helvetica, sans-serif; background-color: #f5f5f5; padding: 20px;">
+        <table width="600" cellpadding="0" cellspacing="0" style="background-color: #ffffff; padding: 24px; border-radius: 6px;">
+            <tr>
+            <td>
+                <p>Hello,</p>
+                <p style="font-size: 18px; font-weight: bold;">{template["headline"]}</p>
+                <p>{template["body"]}</p>
+                <p>Thank you for choosing us!</p>
+            </td>
+            </tr>
+        </table>
+    </body>
+    </html>
+    """
+    return template["subject"], html
+
+
+def variant_for(probability):
+    return "high_risk" if probability >= 0.8 else "at_risk"
+
+
+# -------------------------------
+# Recipient selection (ordered by username so runs can resume)
+# -------------------------------
+def _with_emails(usernames):
+    return {
+        doc["username"]: doc["email"]
+        for doc in login_collection.find(
+            {"username": {"$in": usernames}, "email": {"$exists": True}},
+            {"_id": 0, "username": 1, "email": 1}
+        )
+    }
+
+
+def _stored_recipients(threshold, after, max_age_hours):
+    cursor = score_collection.find(
+        {
+            "churn_probability": {"$gte": threshold},
+            "scored_at": {"$gte": datetime.now() - timedelta(hours=max_age_hours)},
+            "username": {"$gt": after}
+        },
+        {"_id": 0, "username": 1, "churn_probability": 1}
+    ).sort("username", 1).batch_size(CHUNK_SIZE)
+
+    chunk = []
+    for doc in cursor:
+        chunk.append(doc)
+        if len(chunk) == CHUNK_SIZE:
+            yield from _attach_emails(chunk)
+            chunk = []
+    if chunk:
+        yield from _attach_emails(chunk)
+
+
+def _attach_emails(chunk):
+    emails = _with_emails([doc["username"] for doc in chunk])
+    for doc in chunk:
+        if doc["username"] in emails:
+            yield doc["username"], emails[doc["username"]], doc["churn_probability"]
+
+
+def _live_recipients(threshold, after):
+    cursor = login_collection.find(
+        {"taken_subscription": True, "email": {"$exists": True}, "username": {"$gt": after}},
+        {"_id": 0, "username": 1, "email": 1}
+    ).sort("username", 1).batch_size(CHUNK_SIZE)
+
+    now = datetime.now()
+    chunk = []
+
+    def scored(chunk):
+        _, probabilities = score_chunk([doc["username"] for doc in chunk], now)
+        for doc, probability in zip(chunk, probabilities):
+            if probability >= threshold:
+                yield doc["username"], doc["email"], round(float(probability), 3)
+
+    for doc in cursor:
+        chunk.append(doc)
+        if len(chunk) == CHUNK_SIZE:
+            yield from scored(chunk)
+            chunk = []
+    if chunk:
+        yield from scored(chunk)
+
+
+# -------------------------------
+# Campaign runner
+# Failed sends are kept in the checkpoint ("failed_recipients") and
+# retried in a pass at the end of the run; a campaign is only
+# "completed" once that list is empty. Re-running a campaign left in
+# "completed_with_failures" runs the retry pass only.
+# -------------------------------
+def _retry_recipients(failed_recipients):
+    emails = _with_emails([entry["username"] for entry in failed_recipients])
+    for entry in failed_recipients:
+        if entry["username"] in emails:
+            yield entry["username"], emails[entry["username"]], entry["churn_probability"]
+
+
+def run_campaign(campaign_id, threshold=PREDICTION_THRESHOLD, source="stored", rate=5.0,
+                 max_age_hours=48, restart=False, dry_run=False):
+    checkpoint = checkpoint_collection.find_one({"_id": campaign_id}) or {}
+    if restart:
+        checkpoint = {}
+    elif checkpoint.get("status") == "completed":
+        logger.info(f"Campaign {campaign_id} already completed")
+        return checkpoint
+
+    retry_only = checkpoint.get("status") == "completed_with_failures"
+    after = checkpoint.get("last_username", "")
+    sent = checkpoint.get("sent", 0)
+    failed_recipients = {
+        entry["username"]: entry for entry in checkpoint.get("failed_recipients", [])
+    }
+    logger.info(
+        f"Campaign {campaign_id} starting after '{after}' "
+        f"({sent} already sent, {len(failed_recipients)} to retry)"
+    )
+
+    rendered = {variant: render_variant(variant) for variant in RETENTION_TEMPLATES}
+
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    pool = create_smtp_pool(config, size=1)
+
+    def save_checkpoint(last_username, status="running"):
+        if dry_run:
+            return
+        checkpoint_collection.update_one(
+            {"_id": campaign_id},
+            {
+                "$set": {
+                    "last_username": last_username,
+                    "sent": sent,
+                    "failed": len(failed_recipients),
+                    "failed_recipients": list(failed_recipients.values()),
+                    "status": status,
+                    "threshold": threshold,
+                    "source": source,
+                    "updated_at": datetime.now()
+                },
+                "$setOnInsert": {"started_at": datetime.now()}
+            },
+            upsert=True
+        )
+
+    interval = 1 / rate if rate > 0 else 0
+    next_slot = time.perf_counter()
+    started = time.perf_counter()
+    processed = 0
+    retried = 0
+    last_username = after
+
+    def send(username, email, probability):
+        nonlocal next_slot, sent
+
+        # Controlled send rate
+        wait = next_slot - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        next_slot = max(next_slot, time.perf_counter()) + interval
+
+        subject, html = rendered[variant_for(probability)]
+        message = MIMEText(html, "html")
+        message["Subject"] = subject
+        message["From"] = Config.SENDER_EMAIL
+        message["To"] = email
+
+        try:
+            if not dry_run:
+                pool.send(message)
+            sent += 1
+            failed_recipients.pop(username, None)
+        except Exception:
+            logger.exception(f"Retention e-mail to {username} failed")
+            failed_recipients[username] = {"username": username, "churn_probability": probability}
+
+    if not retry_only:
+        recipients = (
+            _stored_recipients(threshold, after, max_age_hours)
+            if source == "stored" else
+            _live_recipients(threshold, after)
+        )
+        for username, email, probability in recipients:
+            send(username, email, probability)
+
+            processed += 1
+            last_username = username
+            if processed % CHECKPOINT_EVERY == 0:
+                save_checkpoint(last_username)
+                elapsed = time.perf_counter() - started
+                logger.info(
+                    f"Campaign {campaign_id} : {sent} sent, {len(failed_recipients)} failed, "
+                    f"{processed / elapsed:.1f} emails/s"
+                )
+
+    # Retry pass over everything that failed, in this run or earlier ones
+    if failed_recipients:
+        logger.info(f"Campaign {campaign_id} : retrying {len(failed_recipients)} failed recipients")
+        for username, email, probability in _retry_recipients(list(failed_recipients.values())):
+            send(username, email, probability)
+            retried += 1
+
+    pool.close_all()
+    save_checkpoint(last_username, status="completed_with_failures" if failed_recipients else "completed")
+
+    elapsed = time.perf_counter() - started
+    result = {
+        "campaign_id": campaign_id,
+        "processed": processed,
+        "retried": retried,
+        "sent": sent,
+        "failed": len(failed_recipients),
+        "seconds": round(elapsed, 3),
+        "emails_per_second": round((processed + retried) / elapsed, 2) if elapsed else 0.0
+    }
+    logger.info(f"Campaign finished : {result}")
+    return result
+
+
+# Usage: python -m services.retention_campaign_service --campaign-id oct-winback --threshold 0.7
+# Re-running with the same --campaign-id resumes from the last checkpoint
+# and retries recipients whose e-mail failed.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send retention e-mails to churn-risk subscribers")
+    parser.add_argument("--campaign-id", required=True)
+    parser.add_argument("--threshold", type=float, default=PREDICTION_THRESHOLD)
+    parser.add_argument("--source", choices=["stored", "live"], default="stored",
+                        help="read churn_scores or score subscribers on the fly")
+    parser.add_argument("--rate", type=float, default=5.0, help="emails per second")
+    parser.add_argument("--max-age-hours", type=float, default=48, help="freshness of stored scores")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    run_campaign(
+        args.campaign_id,
+        threshold=args.threshold,
+        source=args.source,
+        rate=args.rate,
+        max_age_hours=args.max_age_hours,
+        restart=args.restart,
+        dry_run=args.dry_run
+    )
@@ -0,0 +1,78 @@
+import time
+from logger import LoggerFactory
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+# -------------------------------
+# Verified Socket.IO identities
+# The JWT is verified once per socket (at connect, or on the first event
+# that carries a token) and the identity is cached by sid until the
+# socket disconnects or the token expires.
+# -------------------------------
+class SocketIdentityCache:
+
+    def __init__(self, decode):
+        self.decode = decode            # e.g. flask_jwt_extended.decode_token
+        self._identities = {}           # sid -> (identity, exp)
+        self.verifications = 0
+        self.failures = 0
+        self.hits = 0
+        self.expired = 0
+
+    def authenticate(self, sid, token):
+        """
+        Verifies the token and caches the identity for sid. Returns the
+        identity, or None if the token is missing or invalid.
+        """
+        if not token:
+            return None
+
+        self.verifications += 1
+        try:
+            claims = self.decode(token)
+        except Exception:
+            self.failures += 1
+            return None
+
+        username = claims.get("sub")
+        if not username:
+            self.failures += 1
+            return None
+
+        identity = {"username": username, "avatar": username[0].upper()}
+        self._identities[sid] = (identity, claims.get("exp"))
+        return identity
+
+    def get(self, sid):
+        entry = self._identities.get(sid)
+        if entry is None:
+            return None
+
+        identity, exp = entry
+        if exp is not None and exp <= time.time():
+            self._identities.pop(sid, None)
+            self.expired += 1
+            return None
+
+        self.hits += 1
+        return identity
+
+    def resolve(self, sid, token=None):
+        """
+        Cached identity for sid; falls back to verifying token (first
+        event, or a refreshed token after expiry).
+        """
+        return self.get(sid) or self.authenticate(sid, token)
+
+    def evict(self, sid):
+        self._identities.pop(sid, None)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._identities),
+            "verifications": self.verifications,
+            "failures": self.failures,
+            "cache_hits": self.hits,
+            "expired": self.expired
+        }
@@ -0,0 +1,286 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from config import Config
+from date_utils import date_expr, since_filter, to_datetime, CREATED_FORMAT
+from logger import LoggerFactory
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+# Spotlight entries stay visible for this long
+SPOTLIGHT_WINDOW = timedelta(days=7)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def list_group_watch(group_watch_collection, username, limit=DEFAULT_PAGE_SIZE, after=None):
+    """
+    Spotlight entries of the last 7 days from every other user, grouped
+    per user and paginated by username. Returns (page, next_cursor).
+
+    Walks the (username, added_at) index in username order and stops at
+    the first entry of user limit + 1, so a page only reads the entries
+    of the users it returns, however large the window grows. (A $group
+    blocks until it has seen its whole input, so an aggregation with
+    $limit after it scans every entry in the window.)
+    """
+    cutoff = datetime.now() - SPOTLIGHT_WINDOW
+
+    username_filter = {"$ne": username}
+    if after:
+        username_filter["$gt"] = after
+
+    cursor = group_watch_collection.find(
+        {"username": username_filter, **since_filter("added_at", cutoff)},
+        {"_id": 0, "username": 1, "explore": 1, "explore_id": 1, "added_at": 1}
+    ).sort([("username", 1), ("added_at", 1)]).batch_size((limit + 1) * 4)
+
+    users = []          # [(username, [(added_at, entry)])]
+    next_cursor = None
+    try:
+        for doc in cursor:
+            try:
+                added_at = to_datetime(doc["added_at"])
+            except ValueError:
+                continue
+            # Legacy string values pass since_filter and are re-checked here
+            if added_at is None or added_at < cutoff:
+                continue
+
+            if not users or users[-1][0] != doc["username"]:
+                if len(users) == limit:
+                    next_cursor = users[-1][0]
+                    break
+                users.append((doc["username"], []))
+            users[-1][1].append((added_at, {"explore": doc["explore"], "explore_id": doc["explore_id"]}))
+    finally:
+        cursor.close()
+
+    page = [
+        {
+            "username": name,
+            "user_movie_list": [entry for _, entry in sorted(items, key=lambda item: item[0])]
+        }
+        for name, items in users
+    ]
+    return page, next_cursor
+
+
+UNIQUE_INDEX_NAME = "username_explore_unique"
+UNIQUE_INDEX_RECHECK = 60
+
+_unique_index_checked_at = None
+_has_unique_index = False
+
+
+def _unique_index_ready(group_watch_collection):
+    """
+    Whether the unique (username, explore, explore_id) index exists. A
+    positive answer is kept; a negative one is re-checked every minute
+    so the fast path turns on once ensure_indexes manages to build it.
+    """
+    global _unique_index_checked_at, _has_unique_index
+
+    now = time.monotonic()
+    if _has_unique_index or (
+        _unique_index_checked_at is not None and now - _unique_index_checked_at < UNIQUE_INDEX_RECHECK
+    ):
+        return _has_unique_index
+
+    _unique_index_checked_at = now
+    try:
+        _has_unique_index = UNIQUE_INDEX_NAME in group_watch_collection.index_information()
+    except Exception:
+        logger.exception("Could not read group_watch indexes")
+        _has_unique_index = False
+
+    if not _has_unique_index:
+        logger.warning(
+            f"group_watch.{UNIQUE_INDEX_NAME} missing, /watch-together uses find-then-write "
+            f"(run python -m migrations.dedupe_group_watch, then rebuild the indexes)"
+        )
+    return _has_unique_index
+
+
+def _add_without_unique_index(group_watch_collection, username, explore, explore_id, now):
+    result = group_watch_collection.find_one(
+        {"username": username, "explore": explore, "explore_id": explore_id},
+        {"added_at": 1}
+    )
+    if result is None:
+        group_watch_collection.insert_one({
+            "username": username,
+            "explore": explore,
+            "explore_id": explore_id,
+            "added_at": now
+        })
+        return True
+
+    if to_datetime(result["added_at"]) >= now - SPOTLIGHT_WINDOW:
+        return False
+
+    group_watch_collection.update_one({"_id": result["_id"]}, {"$set": {"added_at": now}})
+    return True
+
+
+def add_to_spotlight(group_watch_collection, username, explore, explore_id, now):
+    """
+    Single conditional upsert backed by the unique
+    (username, explore, explore_id) index: inserts a new entry, or
+    refreshes one older than 7 days. Returns False when the entry was
+    already added within the window. Without the index (e.g. duplicates
+    not yet removed) the upsert would insert duplicates, so the older
+    find-then-write path is used instead.
+    """
+    if not _unique_index_ready(group_watch_collection):
+        return _add_without_unique_index(group_watch_collection, username, explore, explore_id, now)
+
+    cutoff = now - SPOTLIGHT_WINDOW
+
+    query = {"username": username, "explore": explore, "explore_id": explore_id}
+    if Config.TIMESTAMPS_MIGRATED:
+        query["added_at"] = {"$lt": cutoff}
+    else:
+        query["$expr"] = {"$lt": [date_expr("$added_at", CREATED_FORMAT), cutoff]}
+
+    try:
+        group_watch_collection.update_one(query, {"$set": {"added_at": now}}, upsert=True)
+    except DuplicateKeyError:
+        # The entry exists and is still inside the window
+        return False
+    return True
+
+
+class SpotlightFeed:
+    """
+    In-memory Spotlight feed of the last 7 days. Kept current by this
+    worker's own writes (record) and by a periodic incremental sync that
+    picks up writes made by other workers. The requesting user's own
+    entries are excluded at serve time.
+    """
+
+    # Re-read a little behind the last sync so concurrent writes are not missed
+    SYNC_OVERLAP = timedelta(seconds=5)
+
+    def __init__(self, group_watch_collection, refresh_interval=30):
+        self.collection = group_watch_collection
+        self.refresh_interval = refresh_interval
+        self._entries = {}          # username -> {(explore, explore_id): added_at}
+        self._snapshot = None       # (usernames, rows) sorted by username; record() patches it
+        self._lock = threading.Lock()
+        self._last_sync = None
+        self._thread = None
+        self.loaded = False
+
+    def record(self, username, explore, explore_id, added_at):
+        with self._lock:
+            self._entries.setdefault(username, {})[(explore, explore_id)] = added_at
+            if self._snapshot is None:
+                return
+
+            # Only this user's row changes: replace it, or insert it in username order
+            usernames, rows = self._snapshot
+            row = self._row(username)
+            index = bisect_left(usernames, username)
+            if index < len(usernames) and usernames[index] == username:
+                rows[index] = row
+            else:
+                usernames.insert(index, username)
+                rows.insert(index, row)
+
+    def _prune(self, cutoff):
+        for username in list(self._entries):
+            items = self._entries[username]
+            for key in [k for k, added_at in items.items() if added_at < cutoff]:
+                del items[key]
+            if not items:
+                del self._entries[username]
+
+    def sync(self):
+        started = datetime.now()
+        cutoff = started - SPOTLIGHT_WINDOW
+
+        if self._last_sync is None:
+            query = since_filter("added_at", cutoff)
+        else:
+            query = {"added_at": {"$gte": self._last_sync - self.SYNC_OVERLAP}}
+
+        docs = self.collection.find(query, {"_id": 0, "username": 1, "explore": 1, "explore_id": 1, "added_at": 1})
+
+        with self._lock:
+            for doc in docs:
+                try:
+                    added_at = to_datetime(doc["added_at"])
+                except ValueError:
+                    continue
+                if added_at >= cutoff:
+                    items = self._entries.setdefault(doc["username"], {})
+                    key = (doc["explore"], doc["explore_id"])
+                    items[key] = max(items.get(key, added_at), added_at)
+            self._prune(cutoff)
+            self._snapshot = None
+
+        self._last_sync = started
+        self.loaded = True
+
+    def _row(self, username):
+        return sorted(self._entries[username].items(), key=lambda item: item[1])
+
+    def _build_snapshot(self):
+        usernames = sorted(self._entries)
+        return usernames, [self._row(username) for username in usernames]
+
+    def page(self, exclude_username, limit=DEFAULT_PAGE_SIZE, after=None):
+        """
+        Same contract as list_group_watch: (page, next_cursor).
+        """
+        cutoff = datetime.now() - SPOTLIGHT_WINDOW
+
+        page = []
+        # Held while reading: record() patches the snapshot lists in place
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._build_snapshot()
+            usernames, rows = self._snapshot
+
+            start = bisect_right(usernames, after) if after else 0
+            for index in range(start, len(usernames)):
+                username = usernames[index]
+                if username == exclude_username:
+                    continue
+                movies = [
+                    {"explore": explore, "explore_id": explore_id}
+                    for (explore, explore_id), added_at in rows[index]
+                    if added_at >= cutoff
+                ]
+                if not movies:
+                    continue
+                page.append({"username": username, "user_movie_list": movies})
+                if len(page) > limit:
+                    break
+
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = page[-1]["username"]
+
+        return page, next_cursor
+
+    def _worker(self):
+        while True:
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Spotlight feed sync failed")
+            time.sleep(self.refresh_interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._worker, name="spotlight-feed", daemon=True)
+        self._thread.start()
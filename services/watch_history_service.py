@@ -0,0 +1,118 @@
+from datetime import timedelta
+from logger import LoggerFactory
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+# -------------------------------
+# /watched : heatmap + streak in one atomic pipeline update
+# -------------------------------
+def _streak_pipeline(today, yesterday):
+    """
+    Increments today's heatmap frequency (or appends today's entry) and,
+    only when today is a new day, recomputes movie_count / max_streak.
+    Runs as a single update, so concurrent calls cannot race.
+    """
+    watched_dates = {"$ifNull": ["$watched_data.date", []]}
+    return [
+        {
+            "$set": {
+                "_had_today": {"$in": [today, watched_dates]},
+                "_had_yesterday": {"$in": [yesterday, watched_dates]}
+            }
+        },
+        {
+            "$set": {
+                "watched_data": {
+                    "$cond": [
+                        "$_had_today",
+                        {
+                            "$map": {
+                                "input": "$watched_data",
+                                "in": {
+                                    "$cond": [
+                                        {"$eq": ["$$this.date", today]},
+                                        {
+                                            "date": "$$this.date",
+                                            "frequency": {"$add": [{"$ifNull": ["$$this.frequency", 0]}, 1]}
+                                        },
+                                        "$$this"
+                                    ]
+                                }
+                            }
+                        },
+                        {"$concatArrays": [
+                            {"$ifNull": ["$watched_data", []]},
+                            [{"date": today, "frequency": 1}]
+                        ]}
+                    ]
+                },
+                "movie_count": {
+                    "$cond": [
+                        "$_had_today",
+                        {"$ifNull": ["$movie_count", 0]},
+                        {"$cond": [
+                            "$_had_yesterday",
+                            {"$add": [{"$ifNull": ["$movie_count", 0]}, 1]},
+                            1
+                        ]}
+                    ]
+                }
+            }
+        },
+        {"$set": {"max_streak": {"$max": [{"$ifNull": ["$max_streak", 0]}, "$movie_count"]}}},
+        {"$project": {"_had_today": 0, "_had_yesterday": 0}}
+    ]
+
+
+def _watched_movies_pipeline(explore, explore_id, created_at):
+    """
+    Moves (explore, explore_id) to the end of watched_movies with a fresh
+    created_at, inserting it if it was not there yet.
+    """
+    entry = {"$literal": [{"explore": explore, "explore_id": explore_id, "created_at": created_at}]}
+    explore = {"$literal": explore}
+    explore_id = {"$literal": explore_id}
+    return [
+        {
+            "$set": {
+                "watched_movies": {
+                    "$concatArrays": [
+                        {
+                            "$filter": {
+                                "input": {"$ifNull": ["$watched_movies", []]},
+                                "cond": {"$or": [
+                                    {"$ne": ["$$this.explore", explore]},
+                                    {"$ne": ["$$this.explore_id", explore_id]}
+                                ]}
+                            }
+                        },
+                        entry
+                    ]
+                }
+            }
+        }
+    ]
+
+
+def record_watched(users_collection, subscriptions_collection, username, explore, explore_id, now):
+    """
+    Returns False when the user does not exist.
+    """
+    today = now.strftime("%Y-%m-%d")
+    yesterday = (now - timedelta(days=1)).strftime("%Y-%m-%d")
+
+    result = users_collection.update_one(
+        {"username": username},
+        _streak_pipeline(today, yesterday)
+    )
+    if result.matched_count == 0:
+        return False
+
+    # No upsert: a subscriptions document is what makes a user premium
+    subscriptions_collection.update_one(
+        {"username": username},
+        _watched_movies_pipeline(explore, explore_id, now)
+    )
+    return True
@@ -0,0 +1,216 @@
+import random
+import string
+import threading
+from collections import deque
+from datetime import datetime, timedelta, UTC
+from config import Config
+from cache import TTLCache
+from logger import LoggerFactory
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+# -------------------------------
+# Watch-party lifecycle
+# expires_at drives the TTL index on watch_parties (Mongo compares it
+# against UTC, so it is always written timezone-aware):
+#   created / joined -> now + idle TTL (sliding)
+#   ended            -> now + short retention
+# -------------------------------
+CODE_CHARS = string.ascii_uppercase + string.digits
+CODE_LENGTH = 6
+
+
+def idle_expiry(now=None):
+    return (now or datetime.now(UTC)) + timedelta(hours=Config.WATCH_PARTY_IDLE_TTL_HOURS)
+
+
+def ended_expiry(now=None):
+    return (now or datetime.now(UTC)) + timedelta(minutes=Config.WATCH_PARTY_ENDED_RETENTION_MINUTES)
+
+
+def random_code(length=CODE_LENGTH):
+    return "".join(random.choices(CODE_CHARS, k=length))
+
+
+def is_party_code(room) -> bool:
+    """
+    Whether a Socket.IO room name can be a watch-party code (as opposed
+    to e.g. a "movie-278" chat room).
+    """
+    return len(room) == CODE_LENGTH and all(char in CODE_CHARS for char in room)
+
+
+class RoomCodePool:
+    """
+    Pre-checked room codes so /create-watch-party takes one without a
+    database round trip. A background thread tops the pool up with one
+    batched $in lookup per refill whenever it falls below the low
+    watermark. Codes are only reserved in this process, so callers still
+    rely on the unique index and retry on DuplicateKeyError.
+    """
+
+    def __init__(self, watch_parties_collection, size=200, length=CODE_LENGTH):
+        self.collection = watch_parties_collection
+        self.size = size
+        self.low_watermark = max(1, size // 4)
+        self.length = length
+        self._codes = deque()
+        self._event = threading.Event()
+        self._thread = None
+        self.taken = 0
+        self.empty = 0
+        self.collisions = 0
+
+    def take(self):
+        """
+        Returns a pre-checked code, or None when the pool is empty.
+        """
+        try:
+            code = self._codes.popleft()
+        except IndexError:
+            self.empty += 1
+            code = None
+        else:
+            self.taken += 1
+
+        if len(self._codes) < self.low_watermark:
+            self._event.set()
+        return code
+
+    def record_collision(self):
+        """
+        Called when a pooled code turned out to be taken (another worker
+        inserted it first).
+        """
+        self.collisions += 1
+
+    def refill(self):
+        missing = self.size - len(self._codes)
+        if missing <= 0:
+            return 0
+
+        # Over-generate so that collisions rarely need a second round
+        candidates = {random_code(self.length) for _ in range(missing * 2)}
+        candidates.difference_update(self._codes)
+        used = {
+            doc["code"] for doc in self.collection.find(
+                {"code": {"$in": list(candidates)}}, {"_id": 0, "code": 1}
+            )
+        }
+        self.collisions += len(used)
+
+        fresh = list(candidates - used)[:missing]
+        self._codes.extend(fresh)
+        return len(fresh)
+
+    def _worker(self):
+        while True:
+            self._event.wait(timeout=Config.ROOM_CODE_POOL_REFILL_INTERVAL)
+            self._event.clear()
+            try:
+                added = self.refill()
+                if added:
+                    logger.info(f"Room code pool refilled with {added} codes")
+            except Exception:
+                logger.exception("Room code pool refill failed")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._worker, name="room-code-pool", daemon=True)
+        self._thread.start()
+        self._event.set()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._codes),
+            "target_size": self.size,
+            "low_watermark": self.low_watermark,
+            "taken": self.taken,
+            "empty": self.empty,
+            "collisions": self.collisions
+        }
+
+
+# -------------------------------
+# Active party / premium cache for /watch-party/<code>
+# A party's metadata never changes while it is active, so GETs are
+# served from memory. Unknown and ended codes are cached too, in a
+# separate bounded cache with a shorter TTL, so floods of dead links
+# neither reach Mongo nor push active parties out. Entries are
+# refreshed after the TTL, which also slides the party's expiry.
+# -------------------------------
+PARTY_MISSING = "missing"
+PARTY_ENDED = "ended"
+
+
+class WatchPartyCache:
+
+    def __init__(self, watch_parties_collection, subscriptions_collection,
+                 maxsize=10000, ttl=60, negative_ttl=15, premium_ttl=300):
+        self.parties = watch_parties_collection
+        self.subscriptions = subscriptions_collection
+        self.negative_ttl = negative_ttl
+        self._party_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # code -> PARTY_ENDED / PARTY_MISSING, kept apart so dead links cannot evict live parties
+        self._negative_cache = TTLCache(maxsize=maxsize, ttl=negative_ttl)
+        self._premium_cache = TTLCache(maxsize=maxsize, ttl=premium_ttl)
+
+    def is_premium(self, username) -> bool:
+        premium = self._premium_cache.get(username)
+        if premium is None:
+            premium = self.subscriptions.find_one({"username": username}, {"_id": 1}) is not None
+            self._premium_cache.set(username, premium, ttl=None if premium else self.negative_ttl)
+        return premium
+
+    def invalidate_premium(self, username):
+        self._premium_cache.pop(username)
+
+    def add_party(self, party: dict) -> dict:
+        entry = {
+            "code":       party["code"],
+            "movie_id":   party["movie_id"],
+            "media_type": party["media_type"],
+            "host":       party["host"]
+        }
+        self._party_cache.set(party["code"], entry)
+        self._negative_cache.pop(party["code"])
+        return entry
+
+    def get_party(self, code):
+        """
+        Returns the active party dict, PARTY_ENDED or PARTY_MISSING.
+        """
+        cached = self._party_cache.get(code)
+        if cached is not None:
+            return cached
+        status = self._negative_cache.get(code)
+        if status is not None:
+            return status
+
+        # Reload slides the expiry of an active party in the same round trip
+        party = self.parties.find_one_and_update(
+            {"code": code, "active": True},
+            {"$set": {"expires_at": idle_expiry()}},
+            projection={"_id": 0, "code": 1, "movie_id": 1, "media_type": 1, "host": 1}
+        )
+        if party:
+            return self.add_party(party)
+
+        ended = self.parties.find_one({"code": code}, {"_id": 1})
+        status = PARTY_ENDED if ended else PARTY_MISSING
+        self._negative_cache.set(code, status)
+        return status
+
+    def end_party(self, code):
+        self._party_cache.pop(code)
+        self._negative_cache.set(code, PARTY_ENDED)
+
+    def stats(self) -> dict:
+        return {
+            "parties": self._party_cache.stats(),
+            "negative": self._negative_cache.stats(),
+            "premium": self._premium_cache.stats(),
+            "negative_ttl_seconds": self.negative_ttl
+        }
@@ -0,0 +1,150 @@
+import threading
+from pymongo import UpdateOne
+from logger import LoggerFactory
+
+
+logger = LoggerFactory.get_logger(__name__)
+
+
+class WatchProgressBuffer:
+    """
+    Coalesces /watch-progress heartbeats per (username, explore, explore_id)
+    and writes them as one bulk_write of upserts every flush_interval
+    seconds, or sooner once max_entries distinct titles are pending.
+    The highest watched_seconds / completion_rate seen is kept.
+    """
+
+    def __init__(self, collection, on_flush=None, flush_interval=5.0, max_entries=500):
+        self.collection = collection
+        self.on_flush = on_flush
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        # metrics
+        self.pings = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failed_flushes = 0
+
+    def add(self, username, explore, explore_id, watched_seconds, total_duration, completion_rate, watched_at):
+        key = (username, explore, explore_id)
+        with self._lock:
+            self.pings += 1
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = {
+                    "username": username,
+                    "explore": explore,
+                    "explore_id": explore_id,
+                    "watched_seconds": watched_seconds,
+                    "total_duration": total_duration,
+                    "completion_rate": completion_rate,
+                    "watched_at": watched_at
+                }
+            else:
+                entry["watched_seconds"] = max(entry["watched_seconds"], watched_seconds)
+                entry["completion_rate"] = max(entry["completion_rate"], completion_rate)
+                entry["total_duration"] = total_duration or entry["total_duration"]
+                entry["watched_at"] = max(entry["watched_at"], watched_at)
+            pending = len(self._pending)
+
+        if pending >= self.max_entries:
+            self._wakeup.set()
+
+    def _merge_back(self, entries):
+        with self._lock:
+            for entry in entries:
+                key = (entry["username"], entry["explore"], entry["explore_id"])
+                current = self._pending.get(key)
+                if current is None:
+                    self._pending[key] = entry
+                else:
+                    current["watched_seconds"] = max(current["watched_seconds"], entry["watched_seconds"])
+                    current["completion_rate"] = max(current["completion_rate"], entry["completion_rate"])
+                    current["watched_at"] = max(current["watched_at"], entry["watched_at"])
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                entries = list(self._pending.values())
+                self._pending = {}
+
+            if not entries:
+                return 0
+
+            operations = [
+                UpdateOne(
+                    {
+                        "username": e["username"],
+                        "explore": e["explore"],
+                        "explore_id": e["explore_id"]
+                    },
+                    {
+                        "$max": {
+                            "watched_seconds": e["watched_seconds"],
+                            "completion_rate": e["completion_rate"],
+                            "watched_at": e["watched_at"]
+                        },
+                        "$set": {"total_duration": e["total_duration"]}
+                    },
+                    upsert=True
+                )
+                for e in entries
+            ]
+
+            try:
+                self.collection.bulk_write(operations, ordered=False)
+            except Exception:
+                # Keep the data for the next attempt instead of dropping it
+                logger.exception("Failed to flush watch progress, will retry")
+                self.failed_flushes += 1
+                self._merge_back(entries)
+                return 0
+
+            self.flushes += 1
+            self.rows_written += len(entries)
+
+            if self.on_flush:
+                try:
+                    self.on_flush(entries)
+                except Exception:
+                    logger.exception("Watch progress flush callback failed")
+
+            return len(entries)
+
+    def _worker(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(timeout=self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._worker, name="watch-progress-flush", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """
+        Stops the flush thread and drains whatever is still buffered.
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        flushed = self.flush()
+        logger.info(f"Watch progress buffer drained ({flushed} rows)")
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "pings": self.pings,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failed_flushes": self.failed_flushes,
+            "coalescing_ratio": round(self.pings / self.rows_written, 2) if self.rows_written else 0.0
+        }
@@ -0,0 +1,36 @@
+from services.chatbot_cache_service import QuerySimilarityCache, normalize_query
+
+
+CACHED_QUERY = "romantic comedy from the 90s with happy ending under 2 hours"
+
+
+def make_cache(threshold=0.85):
+    cache = QuerySimilarityCache(maxsize=16, threshold=threshold)
+    cache.add(CACHED_QUERY, "cached reply")
+    cache.add("scary horror movie for tonight", "horror reply")
+    cache.add("animated family film for kids", "family reply")
+    return cache
+
+
+def test_normalize_query_folds_plurals_number_words_and_filler():
+    assert normalize_query("Sad movies under two hours please") == normalize_query("sad movie under 2 hrs")
+
+
+def test_near_duplicate_query_hits():
+    cache = make_cache()
+    assert cache.lookup("Romantic comedies from the 90s with a happy ending, under two hours") == "cached reply"
+    assert cache.lookup("romantic comedy from the 90s with happy ending under 2 hours tonight") == "cached reply"
+
+
+def test_different_mood_never_matches():
+    # Even with a permissive threshold a single changed mood word is a miss
+    cache = make_cache(threshold=0.5)
+    assert cache.lookup("romantic comedy from the 90s with sad ending under 2 hours") is None
+    assert cache.rejected > 0
+
+
+def test_different_genre_or_number_never_matches():
+    cache = make_cache(threshold=0.5)
+    assert cache.lookup("romantic drama from the 90s with happy ending under 2 hours") is None
+    assert cache.lookup("romantic comedy from the 80s with happy ending under 2 hours") is None
+    assert cache.lookup("romantic comedy from the 90s with happy ending under 3 hours") is None
@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from services.churn_inference_service import ChurnInferenceQueue
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SlowModel:
+    """
+    Scores row[0] / 10; each predict_proba takes a fixed time, like a real
+    model call, so concurrent requests pile up behind it.
+    """
+
+    def __init__(self, seconds=0.02):
+        self.seconds = seconds
+        self.calls = []
+
+    def predict_proba(self, matrix):
+        self.calls.append(len(matrix))
+        time.sleep(self.seconds)
+        return np.column_stack([1 - matrix[:, 0] / 10, matrix[:, 0] / 10])
+
+
+def test_concurrent_scores_are_batched():
+    model = SlowModel()
+    inference = ChurnInferenceQueue(model, max_batch_rows=64, max_wait_ms=20)
+    results = {}
+    barrier = threading.Barrier(32)
+
+    def call(i):
+        barrier.wait()
+        results[i] = inference.score([i % 10])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {i: (i % 10) / 10 for i in range(32)}
+    assert inference.max_batch_size > 1
+    assert inference.batches < 32
+    assert inference.inline_fallbacks == 0
+
+
+def test_concurrent_scores_are_batched_under_eventlet():
+    # Green threads need a process of their own: monkey patching is global
+    pytest.importorskip("eventlet")
+    script = textwrap.dedent("""
+        import eventlet
+        eventlet.monkey_patch()
+
+        import numpy as np
+        from services.churn_inference_service import ChurnInferenceQueue
+
+        class Model:
+            def predict_proba(self, matrix):
+                eventlet.sleep(0.02)
+                return np.column_stack([1 - matrix[:, 0] / 10, matrix[:, 0] / 10])
+
+        inference = ChurnInferenceQueue(Model(), max_batch_rows=64, max_wait_ms=20)
+        pool = eventlet.GreenPool()
+        scores = list(pool.imap(lambda i: inference.score([i % 10]), range(32)))
+        assert scores == [(i % 10) / 10 for i in range(32)], scores
+        stats = inference.stats()
+        print(stats["max_batch_size"], stats["batches"], stats["inline_fallbacks"])
+    """)
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    max_batch_size, batches, inline_fallbacks = map(int, result.stdout.split())
+    assert max_batch_size > 1
+    assert batches < 32
+    assert inline_fallbacks == 0
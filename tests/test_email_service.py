@@ -0,0 +1,88 @@
+import socket
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+controller_module = pytest.importorskip("aiosmtpd.controller")
+
+from services.email_service import SMTPConnectionPool, MailQueue
+
+
+class RecordingHandler:
+    """
+    Stand-in SMTP server: keeps every delivered message and counts the
+    connections (one EHLO per connection).
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.content.decode())
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = controller_module.Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+
+@pytest.fixture
+def outbox():
+    return mongomock.MongoClient().db.mail_outbox
+
+
+def drain(mail_queue):
+    while (doc := mail_queue._claim()) is not None:
+        mail_queue._deliver(doc)
+
+
+def test_queue_delivers_through_pooled_connection_and_redacts_body(smtp_server, outbox):
+    handler, port = smtp_server
+    pool = SMTPConnectionPool("127.0.0.1", port, use_tls=False, size=1)
+    mail_queue = MailQueue(outbox, pool, sender="noreply@example.com")
+
+    mail_queue.enqueue("a@example.com", "OTP", "<p>Your OTP: 123456</p>")
+    mail_queue.enqueue("b@example.com", "OTP", "<p>Your OTP: 654321</p>")
+    drain(mail_queue)
+    pool.close_all()
+
+    assert len(handler.messages) == 2
+    assert "123456" in handler.messages[0]
+    # Both messages went over the same pooled connection
+    assert handler.connections == 1
+
+    rows = list(outbox.find())
+    assert [row["status"] for row in rows] == ["sent", "sent"]
+    assert all("html" not in row and row["done_at"] for row in rows)
+    assert mail_queue.stats()["sent"] == 2
+
+
+def test_dead_letter_is_redacted(outbox):
+    # Nothing listens on this port
+    pool = SMTPConnectionPool("127.0.0.1", free_port(), use_tls=False, size=1, timeout=2)
+    mail_queue = MailQueue(outbox, pool, sender="noreply@example.com", max_attempts=1)
+
+    mail_queue.enqueue("a@example.com", "OTP", "<p>Your OTP: 123456</p>")
+    drain(mail_queue)
+
+    row = outbox.find_one()
+    assert row["status"] == "failed"
+    assert "html" not in row and row["done_at"] and row["last_error"]
+    assert mail_queue.stats()["dead_letters"] == 1
@@ -0,0 +1,32 @@
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from services.index_service import find_duplicates, duplicate_report
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+def test_find_duplicates_reports_exact_and_case_variant_keys(db):
+    db.subscriptions.insert_many([
+        {"username": "alice"},
+        {"username": "alice"},
+        {"username": "Alice"},
+        {"username": "bob"},
+    ])
+
+    [group] = find_duplicates(db.subscriptions, ["username"])
+    assert group["count"] == 3
+    assert sorted(variant["username"] for variant in group["variants"]) == ["Alice", "alice"]
+
+
+def test_duplicate_report_only_lists_indexes_with_duplicates(db):
+    db.subscriptions.insert_many([{"username": "alice"}, {"username": "ALICE"}])
+    db.users.insert_many([{"username": "alice"}, {"username": "bob"}])
+
+    report = duplicate_report(db)
+    assert list(report) == ["subscriptions.username_unique"]
+    assert report["subscriptions.username_unique"][0]["count"] == 2
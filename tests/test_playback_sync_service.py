@@ -0,0 +1,58 @@
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from services.playback_sync_service import PlaybackSync
+
+
+class Presence:
+    def room_size(self, room):
+        return 1
+
+
+@pytest.fixture
+def parties():
+    collection = mongomock.MongoClient().db.watch_parties
+    collection.insert_one({"code": "PARTY1", "host": "alice", "active": True})
+    return collection
+
+
+def worker(parties):
+    return PlaybackSync(parties, socketio=None, presence=Presence())
+
+
+def test_host_actions_are_persisted_with_increasing_seq(parties):
+    sync = worker(parties)
+
+    snapshot, error = sync.control("PARTY1", "alice", "seek", 120)
+    assert error is None and snapshot["seq"] == 1 and snapshot["position"] == 120
+    assert sync.control("PARTY1", "bob", "pause") == (None, "Only the host can control playback")
+
+    sync.control("PARTY1", "alice", "play")
+    assert parties.find_one()["playback"]["seq"] == 2
+    assert parties.find_one()["playback"]["playing"] is True
+
+
+def test_stale_worker_reloads_instead_of_overwriting(parties):
+    first, second = worker(parties), worker(parties)
+
+    first.control("PARTY1", "alice", "play")            # seq 1, cached by the first worker
+    second.control("PARTY1", "alice", "seek", 600)      # seq 2, persisted by the second one
+
+    # The first worker still caches seq 1; its pause must build on the seek
+    snapshot, error = first.control("PARTY1", "alice", "pause")
+    assert error is None
+    assert snapshot["seq"] == 3
+    assert snapshot["position"] >= 600
+
+    playback = parties.find_one()["playback"]
+    assert playback["seq"] == 3 and playback["playing"] is False
+    assert first.stats()["conflicts"] == 1
+
+
+def test_ended_party_is_not_controlled(parties):
+    sync = worker(parties)
+    sync.control("PARTY1", "alice", "play")
+    parties.update_one({"code": "PARTY1"}, {"$set": {"active": False}})
+
+    assert sync.control("PARTY1", "alice", "pause") == (None, "Watch party not found")
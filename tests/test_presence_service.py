@@ -0,0 +1,117 @@
+import pytest
+
+from services.presence_service import InMemoryPresence, RedisPresence, sweep_presence
+
+
+@pytest.fixture(params=["memory", "redis"])
+def workers(request):
+    """
+    Two presence views as seen by two workers: the same store for the
+    in-memory backend, two RedisPresence instances on one fake server.
+    """
+    if request.param == "memory":
+        store = InMemoryPresence()
+        return store, store
+
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    return (
+        RedisPresence(client=fakeredis.FakeRedis(server=server, decode_responses=True)),
+        RedisPresence(client=fakeredis.FakeRedis(server=server, decode_responses=True))
+    )
+
+
+def test_join_is_visible_to_every_worker(workers):
+    first, second = workers
+    first.join("sid-a", "PARTY1", "alice")
+    second.join("sid-b", "PARTY1", "bob")
+    second.join("sid-b", "movie-42", "bob")
+
+    assert first.members("PARTY1") == {"sid-a": "alice", "sid-b": "bob"}
+    assert second.room_size("PARTY1") == 2
+    assert first.get("sid-b") == {"PARTY1": "bob", "movie-42": "bob"}
+    assert sorted(first.rooms()) == ["PARTY1", "movie-42"]
+
+
+def test_leave_one_room(workers):
+    first, second = workers
+    first.join("sid-a", "PARTY1", "alice")
+    first.join("sid-a", "movie-42", "alice")
+
+    assert second.leave("sid-a", "PARTY1") == {"PARTY1": "alice"}
+    assert first.room_size("PARTY1") == 0
+    assert first.get("sid-a") == {"movie-42": "alice"}
+    # Leaving a room the socket is not in is a no-op
+    assert second.leave("sid-a", "PARTY1") == {}
+
+
+def test_disconnect_leaves_every_room(workers):
+    first, second = workers
+    first.join("sid-a", "PARTY1", "alice")
+    first.join("sid-a", "movie-42", "alice")
+    first.join("sid-b", "PARTY1", "bob")
+
+    # The disconnect is handled by the other worker
+    assert second.leave("sid-a") == {"PARTY1": "alice", "movie-42": "alice"}
+    assert first.get("sid-a") == {}
+    assert first.members("PARTY1") == {"sid-b": "bob"}
+    assert "movie-42" not in first.rooms()
+
+
+def test_end_party_closes_the_room_everywhere(workers):
+    first, second = workers
+    first.join("sid-a", "PARTY1", "alice")
+    second.join("sid-b", "PARTY1", "bob")
+    second.join("sid-b", "movie-42", "bob")
+
+    assert sorted(first.close_room("PARTY1")) == ["sid-a", "sid-b"]
+    assert second.room_size("PARTY1") == 0
+    assert "PARTY1" not in second.rooms()
+    assert second.get("sid-a") == {}
+    assert second.get("sid-b") == {"movie-42": "bob"}
+    # A later disconnect only leaves the rooms still held
+    assert first.leave("sid-b") == {"movie-42": "bob"}
+
+
+class SocketIO:
+    def __init__(self):
+        self.closed = []
+
+    def close_room(self, room):
+        self.closed.append(room)
+
+
+def test_sweep_closes_ended_and_expired_parties_only(workers):
+    mongomock = pytest.importorskip("mongomock")
+    parties = mongomock.MongoClient().db.watch_parties
+    parties.insert_many([
+        {"code": "LIVE01", "active": True},
+        {"code": "ENDED1", "active": False},
+        # EXPIRD has no document left: removed by the TTL index
+    ])
+
+    first, second = workers
+    for room in ("LIVE01", "ENDED1", "EXPIRD", "movie-42"):
+        first.join("sid-a", room, "alice")
+
+    socketio = SocketIO()
+    ended, _ = sweep_presence(second, parties, socketio)
+
+    assert sorted(ended) == ["ENDED1", "EXPIRD"]
+    assert sorted(socketio.closed) == ["ENDED1", "EXPIRD"]
+    assert sorted(first.rooms()) == ["LIVE01", "movie-42"]
+    assert first.get("sid-a") == {"LIVE01": "alice", "movie-42": "alice"}
+
+
+def test_redis_sweep_drops_sids_of_dead_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    mongomock = pytest.importorskip("mongomock")
+    presence = RedisPresence(client=fakeredis.FakeRedis(decode_responses=True))
+    presence.join("sid-a", "movie-42", "alice")
+    presence.join("sid-b", "movie-42", "bob")
+    # sid-b's worker died and its sid hash expired
+    presence.redis.delete(presence._sid_key("sid-b"))
+
+    _, removed = sweep_presence(presence, mongomock.MongoClient().db.watch_parties, SocketIO())
+    assert removed == 0
+    assert presence.members("movie-42") == {"sid-a": "alice"}
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from services.spotlight_service import list_group_watch, SpotlightFeed
+
+
+class CountingCursor:
+    def __init__(self, cursor, counter):
+        self.cursor = cursor
+        self.counter = counter
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    def batch_size(self, size):
+        self.cursor = self.cursor.batch_size(size)
+        return self
+
+    def close(self):
+        self.cursor.close()
+
+    def __iter__(self):
+        for doc in self.cursor:
+            self.counter.read += 1
+            yield doc
+
+
+class CountingCollection:
+    """
+    Counts the documents list_group_watch pulls from its cursor.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.read = 0
+
+    def find(self, *args, **kwargs):
+        return CountingCursor(self.collection.find(*args, **kwargs), self)
+
+
+def seed(users, entries_per_user=3):
+    collection = mongomock.MongoClient().db.group_watch
+    now = datetime.now()
+    collection.insert_many([
+        {
+            "username": f"user{u:04d}",
+            "explore": "movie",
+            "explore_id": u * 100 + e,
+            "added_at": now - timedelta(hours=e)
+        }
+        for u in range(users)
+        for e in range(entries_per_user)
+    ])
+    # Outside the 7-day window
+    collection.insert_one({"username": "user0001", "explore": "tv", "explore_id": 1,
+                           "added_at": now - timedelta(days=8)})
+    return collection
+
+
+def test_pages_by_username_and_excludes_the_caller():
+    collection = seed(users=5)
+
+    page, next_cursor = list_group_watch(collection, "user0000", limit=2)
+    assert [row["username"] for row in page] == ["user0001", "user0002"]
+    assert next_cursor == "user0002"
+    # Oldest first, expired entries left out
+    assert [m["explore_id"] for m in page[0]["user_movie_list"]] == [102, 101, 100]
+
+    page, next_cursor = list_group_watch(collection, "user0000", limit=2, after=next_cursor)
+    assert [row["username"] for row in page] == ["user0003", "user0004"]
+    assert next_cursor is None
+
+
+def test_page_reads_only_the_users_it_returns():
+    for users in (20, 1000):
+        collection = CountingCollection(seed(users=users))
+        list_group_watch(collection, "user0000", limit=5, after="user0004")
+        # Five users of three entries, plus the first entry of the sixth
+        assert collection.read == 5 * 3 + 1
+
+
+def test_feed_record_patches_the_snapshot_in_place():
+    feed = SpotlightFeed(seed(users=3))
+    feed.sync()
+    feed.page("nobody")
+    snapshot = feed._snapshot
+
+    now = datetime.now()
+    feed.record("user0001", "tv", 7, now)           # existing user, new entry
+    feed.record("user0000a", "movie", 1, now)       # new user, lands between user0000 and user0001
+
+    assert feed._snapshot is snapshot
+    page, _ = feed.page("nobody")
+    assert [row["username"] for row in page] == ["user0000", "user0000a", "user0001", "user0002"]
+    assert page[2]["user_movie_list"][-1] == {"explore": "tv", "explore_id": 7}
@@ -0,0 +1,91 @@
+"""
+Parallel /watched updates against a real MongoDB (mongomock cannot show
+races; test_watch_history_service.py covers the updates themselves).
+Set MONGO_TEST_URI, e.g.
+    MONGO_TEST_URI=mongodb://localhost:27017 python -m pytest tests/test_watch_history_concurrency.py
+Each run uses a throw-away database that is dropped afterwards.
+"""
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+pymongo = pytest.importorskip("pymongo")
+
+from services.watch_history_service import record_watched
+
+
+PARALLEL_CALLS = 40
+START = datetime(2026, 10, 1, 20, 0, 0)
+
+
+@pytest.fixture
+def db():
+    uri = os.getenv("MONGO_TEST_URI")
+    if not uri:
+        pytest.skip("MONGO_TEST_URI not set")
+
+    client = pymongo.MongoClient(uri, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip("MongoDB not reachable")
+
+    name = f"test_watch_history_{uuid.uuid4().hex[:8]}"
+    database = client[name]
+    database.users.insert_one({"username": "alice"})
+    database.subscriptions.insert_one({"username": "alice"})
+    yield database
+    client.drop_database(name)
+    client.close()
+
+
+def fire_parallel(db, now, calls=PARALLEL_CALLS):
+    barrier = threading.Barrier(calls)
+
+    def call(i):
+        barrier.wait()
+        return record_watched(db.users, db.subscriptions, "alice", "movie", i % 5, now)
+
+    with ThreadPoolExecutor(max_workers=calls) as pool:
+        assert all(pool.map(call, range(calls)))
+
+
+def test_parallel_calls_on_one_day(db):
+    fire_parallel(db, START)
+
+    user = db.users.find_one({"username": "alice"})
+    assert user["watched_data"] == [{"date": "2026-10-01", "frequency": PARALLEL_CALLS}]
+    assert user["movie_count"] == 1
+    assert user["max_streak"] == 1
+
+    watched = db.subscriptions.find_one({"username": "alice"})["watched_movies"]
+    assert sorted(m["explore_id"] for m in watched) == [0, 1, 2, 3, 4]
+
+
+def test_streak_over_consecutive_days_then_a_gap(db):
+    for day in range(5):
+        fire_parallel(db, START + timedelta(days=day))
+
+    user = db.users.find_one({"username": "alice"})
+    assert [entry["frequency"] for entry in user["watched_data"]] == [PARALLEL_CALLS] * 5
+    assert user["movie_count"] == 5
+    assert user["max_streak"] == 5
+
+    # Skipping a day resets the current streak but keeps the best one
+    fire_parallel(db, START + timedelta(days=6))
+
+    user = db.users.find_one({"username": "alice"})
+    assert len(user["watched_data"]) == 6
+    assert user["watched_data"][-1] == {"date": "2026-10-07", "frequency": PARALLEL_CALLS}
+    assert user["movie_count"] == 1
+    assert user["max_streak"] == 5
+
+
+def test_unknown_user_is_not_created(db):
+    assert not record_watched(db.users, db.subscriptions, "bob", "movie", 1, START)
+    assert db.users.count_documents({"username": "bob"}) == 0
+    assert db.subscriptions.count_documents({"username": "bob"}) == 0
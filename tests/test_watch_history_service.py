@@ -0,0 +1,74 @@
+"""
+The /watched pipeline updates run against mongomock, one call at a time.
+Parallel calls need a real MongoDB: see test_watch_history_concurrency.py.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from services.watch_history_service import record_watched
+
+
+START = datetime(2026, 10, 1, 20, 0, 0)
+
+
+@pytest.fixture
+def db():
+    database = mongomock.MongoClient().db
+    database.users.insert_one({"username": "alice"})
+    database.subscriptions.insert_one({"username": "alice"})
+    return database
+
+
+def watch(db, explore_id, day, explore="movie"):
+    return record_watched(db.users, db.subscriptions, "alice", explore, explore_id, START + timedelta(days=day))
+
+
+def test_same_day_increments_frequency(db):
+    for explore_id in (1, 2, 1):
+        assert watch(db, explore_id, day=0)
+
+    user = db.users.find_one({"username": "alice"})
+    assert user["watched_data"] == [{"date": "2026-10-01", "frequency": 3}]
+    assert user["movie_count"] == 1
+    assert user["max_streak"] == 1
+    # Helper fields of the pipeline are not stored
+    assert "_had_today" not in user and "_had_yesterday" not in user
+
+
+def test_streak_then_gap_keeps_the_best_streak(db):
+    for day in (0, 1, 2, 4):
+        watch(db, 1, day)
+
+    user = db.users.find_one({"username": "alice"})
+    assert [entry["date"] for entry in user["watched_data"]] == [
+        "2026-10-01", "2026-10-02", "2026-10-03", "2026-10-05"
+    ]
+    assert user["movie_count"] == 1
+    assert user["max_streak"] == 3
+
+
+def test_rewatch_moves_the_title_to_the_end(db):
+    watch(db, 1, day=0)
+    watch(db, 2, day=0)
+    watch(db, 1, day=1)
+
+    watched = db.subscriptions.find_one({"username": "alice"})["watched_movies"]
+    assert [(m["explore"], m["explore_id"]) for m in watched] == [("movie", 2), ("movie", 1)]
+    assert watched[-1]["created_at"] == START + timedelta(days=1)
+
+
+def test_client_values_are_stored_literally(db):
+    watch(db, "$username", day=0, explore="$explore")
+
+    [movie] = db.subscriptions.find_one({"username": "alice"})["watched_movies"]
+    assert movie["explore"] == "$explore"
+    assert movie["explore_id"] == "$username"
+
+
+def test_unknown_user_is_not_created(db):
+    assert not record_watched(db.users, db.subscriptions, "bob", "movie", 1, START)
+    assert db.users.count_documents({"username": "bob"}) == 0
+    assert db.subscriptions.count_documents({"username": "bob"}) == 0